@@ -1,13 +1,20 @@
 """Cohere AI Assistant."""
+import asyncio
 import os
 import cohere
 import json
 from datetime import datetime
-from config import MAX_HISTORY, MODEL, TEMPERATURE, MAX_TOKENS
+from config import MAX_HISTORY, MODEL, TEMPERATURE, MAX_TOKENS, RETRIEVAL_TOP_K, COHERE_BASE_URL
+from retry import cohere_retry_policy
+from turns import TurnStore
+
+# Retries are left to the shared retry policy rather than the SDK
+NO_SDK_RETRIES = {"max_retries": 0}
 
 
 class Assistant:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, retriever=None, semantic_cache=None, base_url=COHERE_BASE_URL,
+                 rate_limiter=None, retry_policy=None):
         if api_key is None:
             api_key  = os.getenv('COHERE_API_KEY')
 
@@ -16,8 +23,36 @@ class Assistant:
 
         self.api_key = api_key
 
-        self.client = cohere.Client(self.api_key)
-        self.history = []
+        self._client_options = {"base_url": base_url} if base_url else {}
+        self.client = cohere.Client(self.api_key, **self._client_options)
+        self._async_client = None
+        self.history = TurnStore()
+        # Bumped by clear_history so replies to older requests are not recorded
+        self._history_epoch = 0
+        # Chats run one at a time, so each sees the exchange sent before it
+        self._chat_lock = asyncio.Lock()
+
+        # Optional rate_limiter.RateLimiter shared by every upstream call
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy if retry_policy is not None else cohere_retry_policy()
+
+        # Optional semantic_cache.SemanticCache for context-free questions
+        self.semantic_cache = semantic_cache
+
+        # Optional retrieval.Retriever; its contexts ground each reply
+        self._retriever = retriever
+        self.last_contexts = []
+
+    @property
+    def retriever(self):
+        return self._retriever
+
+    @retriever.setter
+    def retriever(self, retriever):
+        # Cached answers were grounded in the old retriever's contexts
+        if retriever is not self._retriever and self.semantic_cache is not None:
+            self.semantic_cache.clear()
+        self._retriever = retriever
 
     def chat(self, message):
         """Send message and get response."""
@@ -26,29 +61,191 @@ class Assistant:
             self.history.append({"role": "USER", "message": message})
 
             # Keep only recent history
-            recent_history = self.history[-MAX_HISTORY:]
+            recent_history = self.history.window(MAX_HISTORY)
 
-            # Get response from Cohere
-            response = self.client.chat(
-                model=MODEL,
-                message=message,
-                chat_history=recent_history[:-1],  # Exclude current message
-                temperature=TEMPERATURE,
-                max_tokens=MAX_TOKENS
-            )
+            # Get a grounded response from Cohere, excluding the current message from history
+            text, self.last_contexts = self.complete(message, recent_history[:-1])
 
             # Add assistant response to history
-            self.history.append({"role": "CHATBOT", "message": response.text})
+            self.history.append({"role": "CHATBOT", "message": text})
+
+            return text
+
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    def complete(self, message, chat_history=None):
+        """Stateless reply to `message` given `chat_history`.
+
+        Sync counterpart of acomplete: raises instead of returning an error
+        string. Returns (reply text, contexts used).
+        """
+        # Only questions without history are independent of the conversation
+        cacheable = self.semantic_cache is not None and not chat_history
+        if cacheable:
+            cache_vector, cached = self._cache_lookup(message)
+            if cached is not None:
+                return cached, []
+
+        extra = {}
+        contexts = self.retriever.search(message, RETRIEVAL_TOP_K) if self.retriever else []
+        if contexts:
+            extra["documents"] = [{"text": context} for context in contexts]
+
+        response = self._send(
+            self.client.chat,
+            model=MODEL,
+            message=message,
+            chat_history=chat_history or [],
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            **extra
+        )
+        if cacheable:
+            self._cache_store(message, response.text, cache_vector)
+        return response.text, contexts
+
+    def _cache_lookup(self, message):
+        """Return (embedding, cached answer or None); the cache is best-effort.
+
+        If embedding or lookup fails the question is simply generated, so a
+        failing embed call never costs the user their answer.
+        """
+        try:
+            vector = self.semantic_cache.embed(message)
+            return vector, self.semantic_cache.lookup(message, vector)
+        except Exception:
+            return None, None
 
-            return response.text
+    def _cache_store(self, message, reply, vector):
+        """Store a generated answer, ignoring cache failures."""
+        if vector is None:
+            return
+        try:
+            self.semantic_cache.store(message, reply, vector)
+        except Exception:
+            pass
+
+    def _send(self, method, **kwargs):
+        """Call a client method under the rate limiter and retry policy."""
+        def attempt():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return method(request_options=NO_SDK_RETRIES, **kwargs)
+        return self.retry_policy.call(attempt)
+
+    async def _asend(self, method, **kwargs):
+        """Async counterpart of _send."""
+        async def attempt():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire()
+            return await method(request_options=NO_SDK_RETRIES, **kwargs)
+        return await self.retry_policy.acall(attempt)
+
+    @property
+    def async_client(self):
+        """Cohere AsyncClient, created on first async call."""
+        if self._async_client is None:
+            self._async_client = cohere.AsyncClient(self.api_key, **self._client_options)
+        return self._async_client
+
+    async def achat(self, message):
+        """Async chat that can be cancelled while in flight.
+
+        History is only updated once the reply arrives, so a cancelled or
+        failed request leaves it exactly as it was. Chats sent while another is
+        in flight wait their turn, so each is answered with the exchanges sent
+        before it and history keeps the order they were sent in. Cancellation
+        propagates as asyncio.CancelledError instead of an error string.
+        """
+        epoch = self._history_epoch
+        user_turn = {"role": "USER", "message": message}
+        async with self._chat_lock:
+            try:
+                text, contexts = await self.acomplete(message, self.history.window(MAX_HISTORY - 1))
+
+                self.last_contexts = contexts
+                self._record(epoch, user_turn, text)
+
+                return text
+
+            except Exception as e:
+                return f"Error: {str(e)}"
+
+    async def acomplete(self, message, chat_history=None):
+        """Stateless async reply to `message` given `chat_history`.
 
+        Retrieves contexts and takes a rate limiter slot like chat, but neither
+        reads nor writes self.history and raises instead of returning an error
+        string. Without chat_history the semantic cache is consulted first; a
+        cached answer comes without contexts. Returns (reply text, contexts used).
+        """
+        cacheable = self.semantic_cache is not None and not chat_history
+        if cacheable:
+            cache_vector, cached = await asyncio.to_thread(self._cache_lookup, message)
+            if cached is not None:
+                return cached, []
+
+        extra = {}
+        contexts = []
+        if self.retriever:
+            contexts = await asyncio.to_thread(self.retriever.search, message, RETRIEVAL_TOP_K)
+        if contexts:
+            extra["documents"] = [{"text": context} for context in contexts]
+
+        response = await self._asend(
+            self.async_client.chat,
+            model=MODEL,
+            message=message,
+            chat_history=chat_history or [],
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            **extra
+        )
+        if cacheable:
+            self._cache_store(message, response.text, cache_vector)
+        return response.text, contexts
+
+    def _record(self, epoch, user_turn, reply):
+        """Add a finished exchange to history unless it was cleared meanwhile."""
+        if epoch == self._history_epoch:
+            self.history.append(user_turn)
+            self.history.append({"role": "CHATBOT", "message": reply})
+
+    async def asummarize(self, text):
+        """Async summarize that can be cancelled while in flight."""
+        try:
+            return await self.asummarize_text(text)
         except Exception as e:
             return f"Error: {str(e)}"
 
+    async def asummarize_text(self, text):
+        """Async summarize that raises instead of returning an error string."""
+        response = await self._asend(
+            self.async_client.summarize,
+            text=text,
+            model=MODEL,
+            length='medium'
+        )
+        return response.summary
+
+    async def awarm_up(self):
+        """Open the AsyncClient's connection before the first message is sent.
+
+        Pays for DNS, TLS and client setup with a cheap API-key check, so it
+        can run while the user is still typing.
+        """
+        try:
+            await self.async_client.check_api_key()
+            return True
+        except Exception:
+            return False
+
     def summarize(self, text):
         """Summarize text."""
         try:
-            response = self.client.summarize(
+            response = self._send(
+                self.client.summarize,
                 text=text,
                 model=MODEL,
                 length='medium'
@@ -59,7 +256,8 @@ class Assistant:
 
     def clear_history(self):
         """Clear conversation history."""
-        self.history = []
+        self.history.clear()
+        self._history_epoch += 1
         return "History cleared!"
 
     def save_chat(self, filename=None):
@@ -69,7 +267,7 @@ class Assistant:
 
         try:
             with open(filename, 'w') as f:
-                json.dump(self.history, f, indent=2)
+                json.dump(self.history.to_list(), f, indent=2)
             return f"Saved to {filename}"
         except Exception as e:
             return f"Error saving: {str(e)}"
@@ -0,0 +1,221 @@
+"""Batch mode: stream JSONL jobs through the assistant, write JSONL results.
+
+Each input line is one job:
+    {"id": "q1", "prompt": "What is AI?"}
+    {"id": "q2", "prompt": "And ML?", "chat_history": [{"role": "USER", "message": "..."}]}
+    {"id": "s1", "summarize": "Long text..."}
+
+Jobs run concurrently under the assistant's rate limiter. Results carry the
+job id and are written in input order, or as they finish with unordered=True.
+Ids already answered in the output file are skipped, so an interrupted run
+resumes where it stopped by running the same command again. A line that is not
+a JSON object gets an error result with its line number as id.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Optional, Set, TextIO
+
+from config import BATCH_CONCURRENCY
+
+
+def completed_ids(path) -> Set[str]:
+    """Ids of jobs that already have a successful result in `path`."""
+    done = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted run
+                if "error" not in result:
+                    done.add(str(result["id"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def open_results(path) -> TextIO:
+    """Open a results file for appending, dropping a partial last line.
+
+    A run killed mid-write can leave a line without its newline; appending to
+    it would glue the next result onto the fragment and lose both.
+    """
+    try:
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                step = min(4096, position)
+                f.seek(position - step)
+                chunk = f.read(step)
+                if position == end and chunk.endswith(b"\n"):
+                    break
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    f.truncate(position - step + newline + 1)
+                    break
+                position -= step
+            else:
+                f.truncate(0)
+    except FileNotFoundError:
+        pass
+    return open(path, "a")
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class BatchStats:
+    """Throughput and latency of a batch run."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latencies = []
+        self.errors = 0
+        self.skipped = 0
+
+    def report(self) -> Dict[str, float]:
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "completed": len(latencies),
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "p50_s": round(percentile(latencies, 0.50), 3),
+            "p95_s": round(percentile(latencies, 0.95), 3),
+            "p99_s": round(percentile(latencies, 0.99), 3),
+        }
+
+
+def parse_job(line: str, line_number: int) -> dict:
+    """Parse one input line; raises ValueError unless it is a JSON object."""
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError("job must be a JSON object")
+    job.setdefault("id", line_number)
+    return job
+
+
+async def invalid_job(line_number: int, error: Exception) -> dict:
+    """Result line for an input line that could not be parsed."""
+    return {"id": line_number, "error": f"Invalid job: {error}"}
+
+
+async def run_job(assistant, job: dict) -> dict:
+    """Run one job and return its result line (never raises)."""
+    result = {"id": job["id"]}
+    start_time = time.monotonic()
+    try:
+        if "summarize" in job:
+            result["summary"] = await assistant.asummarize_text(job["summarize"])
+        else:
+            result["response"], contexts = await assistant.acomplete(job["prompt"], job.get("chat_history"))
+            if contexts:
+                result["contexts"] = contexts
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_s"] = round(time.monotonic() - start_time, 3)
+    return result
+
+
+async def run_batch(assistant,
+                    lines: Iterable[str],
+                    out: TextIO,
+                    concurrency: int = BATCH_CONCURRENCY,
+                    ordered: bool = True,
+                    skip_ids: Optional[Set[str]] = None) -> BatchStats:
+    """Run every job in `lines`, writing results to `out`.
+
+    At most `concurrency` jobs are in flight, and in ordered mode at most that
+    many finished results wait for an earlier job, so memory stays bounded
+    however long the input is.
+    """
+    stats = BatchStats()
+    skip_ids = skip_ids or set()
+    slots = asyncio.Semaphore(concurrency)
+    finished: Dict[int, dict] = {}
+    next_to_write = 0
+    tasks = set()
+
+    def write(result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        if "error" in result:
+            stats.errors += 1
+        else:
+            stats.latencies.append(result["latency_s"])
+
+    def on_done(seq, task):
+        nonlocal next_to_write
+        tasks.discard(task)
+        if not ordered:
+            write(task.result())
+            slots.release()
+            return
+        finished[seq] = task.result()
+        while next_to_write in finished:
+            write(finished.pop(next_to_write))
+            next_to_write += 1
+            slots.release()
+
+    iterator = iter(lines)
+    seq = 0
+    for line_number in range(sys.maxsize):
+        # Reading may block (stdin), so keep it off the event loop
+        line = await asyncio.to_thread(next, iterator, None)
+        if line is None:
+            break
+        if not line.strip():
+            continue
+        try:
+            job = parse_job(line, line_number)
+        except ValueError as e:
+            # Report the bad line in order with the rest instead of aborting the run
+            coro = invalid_job(line_number, e)
+        else:
+            if str(job["id"]) in skip_ids:
+                stats.skipped += 1
+                continue
+            coro = run_job(assistant, job)
+
+        await slots.acquire()
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(lambda t, n=seq: on_done(n, t))
+        seq += 1
+
+    while tasks:
+        await asyncio.gather(*list(tasks))
+        # Let the last done-callbacks run before checking again
+        await asyncio.sleep(0)
+    return stats
+
+
+def main(assistant, input_path: str, output_path: str, concurrency: int = BATCH_CONCURRENCY,
+         ordered: bool = True):
+    """Run a batch file ("-" for stdin) and print throughput, tail latency and cache hits."""
+    skip_ids = completed_ids(output_path) if output_path != "-" else set()
+    source = sys.stdin if input_path == "-" else open(input_path)
+    out = sys.stdout if output_path == "-" else open_results(output_path)
+    try:
+        stats = asyncio.run(run_batch(assistant, source, out, concurrency, ordered, skip_ids))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    report = stats.report()
+    if assistant.semantic_cache is not None:
+        report["semantic_cache"] = assistant.semantic_cache.stats()
+    print(json.dumps(report), file=sys.stderr)
+    return stats
@@ -0,0 +1,92 @@
+"""Vectorized batch scoring for embedding-based RAGAS metrics.
+
+`answer_similarity` (and the similarity half of `answer_correctness`) embed the
+answer and the reference and take their cosine, one row at a time. Here all
+texts are embedded in bulk into one preallocated float32 matrix, normalized in
+place, and every row's cosine is taken in a single NumPy operation.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import EMBED_BATCH_SIZE
+
+
+def embed_in_batches(embeddings, texts: Sequence[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Embed each distinct text once and return a (len(texts), dim) float32 matrix."""
+    index: Dict[str, int] = {}
+    unique: List[str] = []
+    positions = np.empty(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        if text not in index:
+            index[text] = len(unique)
+            unique.append(text)
+        positions[i] = index[text]
+
+    matrix = None
+    for start in range(0, len(unique), batch_size):
+        vectors = np.asarray(embeddings.embed_documents(unique[start:start + batch_size]), dtype=np.float32)
+        if matrix is None:
+            matrix = np.empty((len(unique), vectors.shape[1]), dtype=np.float32)
+        matrix[start:start + len(vectors)] = vectors
+
+    if matrix is None:
+        return np.empty((len(texts), 0), dtype=np.float32)
+    # Only expand to one row per input when texts repeat
+    return matrix if len(unique) == len(texts) else matrix[positions]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (zero rows stay zero) and return the matrix."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, np.finfo(matrix.dtype).tiny, out=norms)
+    matrix /= norms
+    return matrix
+
+
+def batch_answer_similarity(answers: Sequence[str],
+                            references: Sequence[str],
+                            embeddings,
+                            threshold: Optional[float] = None,
+                            batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Score answer_similarity for every row at once.
+
+    Matches ragas' per-row SemanticSimilarity: cosine of the answer and
+    reference embeddings, or 1.0/0.0 against `threshold` when one is given.
+    """
+    if len(answers) != len(references):
+        raise ValueError("answers and references must have the same length")
+
+    vectors = normalize_rows(embed_in_batches(embeddings, list(answers) + list(references), batch_size))
+    # Slices of one matrix are views, so no per-row copies are made
+    scores = np.einsum("ij,ij->i", vectors[:len(answers)], vectors[len(answers):])
+    if threshold is not None:
+        scores = (scores >= threshold).astype(np.float32)
+    return scores
+
+
+def batch_question_similarity(questions: Sequence[str],
+                              generated_questions: Sequence[Sequence[str]],
+                              embeddings,
+                              batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+    """Embedding half of answer_relevancy for every row at once.
+
+    Returns, per row, the mean cosine between the question and the questions
+    the LLM generated from the answer (NaN for rows with none). The
+    noncommittal check stays with the LLM half of the metric.
+    """
+    if len(questions) != len(generated_questions):
+        raise ValueError("questions and generated_questions must have the same length")
+
+    counts = np.fromiter((len(row) for row in generated_questions), dtype=np.int64, count=len(questions))
+    flat = [question for row in generated_questions for question in row]
+    vectors = normalize_rows(embed_in_batches(embeddings, list(questions) + flat, batch_size))
+
+    similarities = np.einsum("ij,ij->i", np.repeat(vectors[:len(questions)], counts, axis=0),
+                             vectors[len(questions):])
+    scores = np.full(len(questions), np.nan, dtype=np.float32)
+    filled = counts > 0
+    if filled.any():
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        scores[filled] = np.add.reduceat(similarities, starts) / counts[filled]
+    return scores
@@ -0,0 +1,182 @@
+"""Record and replay Cohere HTTP traffic, so tests can run offline.
+
+`Cassette.use()` puts the cassette in front of httpx's default transports,
+which the Cohere SDK (and so langchain-cohere) uses for chat and embed calls
+alike. Requests are matched on a hash of their method, path and canonical JSON
+body; headers, including the API key, are neither matched nor stored. Responses
+live in a gzipped JSON cassette file. Modes:
+
+- "once": replay if the cassette exists, otherwise record it (default)
+- "replay": never go upstream; an unrecorded request raises CassetteMiss
+- "record": send every request upstream and rewrite the cassette
+- "off": leave traffic alone
+
+Identical requests (e.g. the n samples RAGAS asks for) are answered with their
+recorded responses in order. Only 2xx responses are recorded: a rate-limit or
+server error that a retry recovers from is dropped, and a cassette with any
+request that never got a 2xx (e.g. a 401 from a missing API key) is not saved.
+It is also not saved when the block raises or the cassette is discarded, so the
+next "once" run records it afresh. Misses and unsaved recordings raise
+CassetteError when the block exits, because RAGAS turns the errors of
+individual rows into missing scores.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from config import CASSETTE_MODE
+
+MODES = ("once", "replay", "record", "off")
+
+
+class CassetteError(Exception):
+    """Raised when a cassette could not be replayed or recorded completely."""
+
+
+class CassetteMiss(CassetteError):
+    """Raised in replay mode for a request the cassette has no response for."""
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Hash of a request that ignores headers and JSON key order."""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:
+        pass  # not JSON; hash the raw bytes
+    return hashlib.sha256(f"{method} {path}\n".encode() + body).hexdigest()
+
+
+class Cassette:
+    """Recorded responses for one test, keyed by `request_key`."""
+
+    def __init__(self, path, mode: str = CASSETTE_MODE):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}")
+        self.path = Path(path)
+        if mode == "once":
+            mode = "replay" if self.path.exists() else "record"
+        self.mode = mode
+        self.interactions: Dict[str, List[dict]] = self._load() if mode == "replay" else {}
+        self.played = 0
+        self.recorded = 0
+        self.misses = 0
+        self.discarded = False
+        self._next: Dict[str, int] = {}
+        # Requests that have not had a 2xx response yet: key -> last status
+        self._failed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> Dict[str, List[dict]]:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # mtime=0 keeps re-recorded cassettes byte-identical when nothing changed
+        with open(self.path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(self.interactions, sort_keys=True, separators=(",", ":")).encode())
+
+    def _key(self, request: httpx.Request) -> str:
+        return request_key(request.method, request.url.raw_path.decode("ascii"), request.content)
+
+    def _play(self, request: httpx.Request) -> httpx.Response:
+        key = self._key(request)
+        with self._lock:
+            responses = self.interactions.get(key)
+            if not responses:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {request.method} {request.url.path} in "
+                                   f"{self.path}; re-record it with CASSETTE_MODE=record")
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+            self.played += 1
+        recorded = responses[min(index, len(responses) - 1)]
+        if "json" in recorded:
+            content = json.dumps(recorded["json"]).encode()
+        else:
+            content = recorded["text"].encode()
+        return httpx.Response(recorded["status"], headers={"content-type": recorded["content_type"]},
+                              content=content, request=request)
+
+    def _record(self, request: httpx.Request, response: httpx.Response):
+        key = self._key(request)
+        if not response.is_success:
+            with self._lock:
+                self._failed[key] = response.status_code
+            return
+        entry = {"status": response.status_code, "content_type": response.headers.get("content-type", "")}
+        try:
+            entry["json"] = json.loads(response.content)
+        except ValueError:
+            entry["text"] = response.text
+        with self._lock:
+            self.interactions.setdefault(key, []).append(entry)
+            self._failed.pop(key, None)
+            self.recorded += 1
+
+    def discard(self):
+        """Do not save what was recorded, e.g. because the test failed."""
+        self.discarded = True
+
+    def _finish(self):
+        """Save a complete recording; raise if replay or recording fell short."""
+        if self.replaying:
+            if self.misses:
+                raise CassetteMiss(f"{self.misses} requests had no recorded response in {self.path}; "
+                                   f"re-record it with CASSETTE_MODE=record")
+            return
+        if self._failed:
+            statuses = ", ".join(str(status) for status in sorted(set(self._failed.values())))
+            raise CassetteError(f"Not saving {self.path}: {len(self._failed)} requests never got a "
+                                f"2xx response (last status {statuses}); check COHERE_API_KEY")
+        if not self.discarded:
+            self.save()
+
+    @contextmanager
+    def use(self):
+        """Route every httpx request made inside the block through the cassette."""
+        if self.mode == "off":
+            yield self
+            return
+
+        cassette = self
+        send = httpx.HTTPTransport.handle_request
+        asend = httpx.AsyncHTTPTransport.handle_async_request
+
+        def handle_request(transport, request):
+            request.read()
+            if cassette.replaying:
+                return cassette._play(request)
+            response = send(transport, request)
+            response.read()
+            cassette._record(request, response)
+            return response
+
+        async def handle_async_request(transport, request):
+            await request.aread()
+            if cassette.replaying:
+                return cassette._play(request)
+            response = await asend(transport, request)
+            await response.aread()
+            cassette._record(request, response)
+            return response
+
+        httpx.HTTPTransport.handle_request = handle_request
+        httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+        try:
+            yield self
+        finally:
+            httpx.HTTPTransport.handle_request = send
+            httpx.AsyncHTTPTransport.handle_async_request = asend
+        # Only reached when the block exits cleanly; a partial recording is dropped
+        self._finish()
@@ -5,7 +5,7 @@ import os
 from pathlib import Path
 from typing import Dict, Any
 from dotenv import load_dotenv
-from langchain_cohere import ChatCohere, CohereEmbeddings
+from langchain_cohere import CohereEmbeddings
 from ragas.llms import LangchainLLMWrapper
 from ragas.embeddings import LangchainEmbeddingsWrapper
 
@@ -15,9 +15,13 @@ COHERE_API_KEY = os.getenv('COHERE_API_KEY')
 MODEL = 'command-r-plus'
 MAX_TOKENS = 500
 TEMPERATURE = 0.7
+COHERE_BASE_URL = os.getenv('COHERE_BASE_URL')  # None uses the SDK default
 
 # Chat Settings
 MAX_HISTORY = 6
+WARM_UP_CONNECTION = os.getenv('WARM_UP_CONNECTION', '1') == '1'
+COMPRESS_COLD_TURNS = os.getenv('COMPRESS_COLD_TURNS', '1') == '1'  # zstd history turns outside the window
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))  # jobs in flight in batch mode
 
 """ Test data for RAGAS evaluation """
 
@@ -61,13 +65,42 @@ if not COHERE_API_KEY:
 # Model Configuration
 COHERE_MODEL = os.getenv("COHERE_MODEL", "command-r")
 COHERE_EMBED_MODEL = os.getenv("COHERE_EMBED_MODEL", "embed-english-v3.0")
+EMBED_BATCH_SIZE = 96  # Cohere's maximum texts per embed call
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "cohere")  # "cohere" or "local"
+LOCAL_EMBED_DIM = int(os.getenv("LOCAL_EMBED_DIM", "384"))
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.1"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "8000"))
 
+# Retrieval Configuration
+RETRIEVAL_TOP_K = 3
+RETRIEVAL_INDEX_FACTORY = os.getenv("RETRIEVAL_INDEX_FACTORY", "Flat")  # e.g. "IVF4096,Flat" for 1M+ chunks
+RETRIEVAL_INDEX_DIR = DATA_DIR / "retrieval_index"
+
+# Semantic Cache Configuration
+# Off by default: the REPL only asks first-turn questions once per /clear
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))  # cosine similarity
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))  # max cached answers
+
 # Rate Limiting Configuration (for Cohere trial API)
 COHERE_TRIAL_RATE_LIMIT = 40  # calls per minute
 DELAY_BETWEEN_CALLS = 2  # seconds
 REQUEST_TIMEOUT = 60  # seconds
+# Shared secret for the coordinator; required to serve it beyond localhost,
+# since clients can run code on it. Unset, a random per-run key is used.
+RATE_LIMIT_AUTHKEY = os.getenv("RATE_LIMIT_AUTHKEY", "").encode() or None
+
+# Retry Configuration (see retry.py)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 1.0  # seconds
+RETRY_MAX_DELAY = 30.0  # seconds, unless Retry-After asks for longer
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive transient failures before failing fast
+CIRCUIT_RESET_TIMEOUT = 30.0  # seconds before a trial call is let through
+RAGAS_MAX_ATTEMPTS = 1  # ragas' own per-row attempts; retrying is left to retry.py
+
+# Test Cassettes (recorded Cohere HTTP traffic, see cassette.py)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "once")  # "once", "replay", "record" or "off"
+CASSETTES_DIR = BASE_DIR / "tests" / "cassettes"
 
 # Logging Configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -79,63 +112,97 @@ LOGS_DIR.mkdir(exist_ok=True)
 
 
 # RAGAS Configuration Functions
-def get_cohere_llm():
+def get_cohere_llm(rate_limiter=None, callbacks=None):
     """Get configured Cohere LLM with rate limit handling."""
-    return ChatCohere(
+    from retry import RetryingChatCohere
+    return RetryingChatCohere(
         model=COHERE_MODEL,
         temperature=TEMPERATURE,
         max_tokens=MAX_TOKENS,
         timeout=REQUEST_TIMEOUT,
         cohere_api_key=COHERE_API_KEY,
+        attempt_rate_limiter=rate_limiter,
+        callbacks=callbacks,
     )
 
 
-def get_cohere_embeddings():
-    """Get configured Cohere embeddings."""
-    return CohereEmbeddings(
+def get_cohere_embeddings(rate_limiter=None):
+    """Get configured Cohere embeddings with rate limit handling."""
+    from retry import RetryingEmbeddings
+    return RetryingEmbeddings(CohereEmbeddings(
         model=COHERE_EMBED_MODEL,
         cohere_api_key=COHERE_API_KEY,
-    )
-
-
-def get_ragas_config() -> Dict[str, Any]:
-    """Get RAGAS-compatible wrappers for Cohere models."""
-    llm = get_cohere_llm()
-    embeddings = get_cohere_embeddings()
+    ), rate_limiter)
+
+
+def get_local_embeddings():
+    """Get offline CPU embeddings (no API calls) for quick regression runs."""
+    from local_embeddings import LocalHashingEmbeddings
+    return LocalHashingEmbeddings(dim=LOCAL_EMBED_DIM)
+
+
+def get_embeddings(backend=None, rate_limiter=None):
+    """Get embeddings for a backend ("cohere" or "local"), EMBEDDINGS_BACKEND by default.
+
+    `rate_limiter` only applies to Cohere; local embeddings make no API calls.
+    """
+    backend = backend or EMBEDDINGS_BACKEND
+    if backend == "cohere":
+        return get_cohere_embeddings(rate_limiter)
+    if backend == "local":
+        return get_local_embeddings()
+    raise ValueError(f"Unknown embeddings backend: {backend}")
+
+
+def get_ragas_config(rate_limiter=None, memo=None, embeddings_backend=None, profiler=None) -> Dict[str, Any]:
+    """Get RAGAS-compatible wrappers for Cohere models.
+
+    Pass a rate limiter (see rate_limiter.py) to make every LLM and embeddings
+    call, retries included, take a slot from it, e.g. when several processes
+    share one API quota.
+    Pass an `eval_memo.EvaluationMemo` to let metrics evaluated together share
+    identical intermediate LLM calls. `embeddings_backend` ("cohere" or "local")
+    overrides the EMBEDDINGS_BACKEND setting. Pass an
+    `eval_profile.EvaluationProfiler` to record the cost of every upstream call.
+    Pass the returned "run_config" to evaluate() along with the models.
+    """
+    backend = embeddings_backend or EMBEDDINGS_BACKEND
+    if profiler is not None and rate_limiter is not None:
+        rate_limiter = profiler.wrap_rate_limiter(rate_limiter)
+    llm = get_cohere_llm(rate_limiter, callbacks=[profiler.callback_handler] if profiler is not None else None)
+    embeddings = get_embeddings(backend, rate_limiter)
+    if profiler is not None:
+        embeddings = profiler.wrap_embeddings(embeddings)
+
+    if memo is not None:
+        from eval_memo import MemoizedLLMWrapper
+        ragas_llm = MemoizedLLMWrapper(llm, memo)
+    else:
+        ragas_llm = LangchainLLMWrapper(llm)
 
     return {
-        "llm": LangchainLLMWrapper(llm),
-        "embeddings": LangchainEmbeddingsWrapper(embeddings)
+        "llm": ragas_llm,
+        "embeddings": LangchainEmbeddingsWrapper(embeddings),
+        "run_config": get_run_config(),
     }
 
 
+def get_run_config():
+    """RAGAS RunConfig to pass to evaluate().
+
+    ragas otherwise retries every failed row up to 10 times on top of the
+    shared retry policy, CircuitOpenError included, which multiplies wasted
+    calls during an outage and undoes the circuit breaker's fail-fast.
+    """
+    from ragas.run_config import RunConfig
+    return RunConfig(max_retries=RAGAS_MAX_ATTEMPTS)
+
+
 # Rate limit handling decorator
 def handle_rate_limit_error(func):
-    """Decorator to handle Cohere rate limit errors."""
-    import time
-    from functools import wraps
-
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        max_retries = 3
-        retry_delay = 5
-
-        for attempt in range(max_retries):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                error_str = str(e)
-                if "429" in error_str or "rate limit" in error_str.lower():
-                    if attempt < max_retries - 1:
-                        print(f"Rate limit hit, waiting {retry_delay} seconds...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                    else:
-                        raise
-                else:
-                    raise
-
-    return wrapper
+    """Decorator retrying Cohere rate limit and transient errors (see retry.py)."""
+    from retry import cohere_retry_policy
+    return cohere_retry_policy()(func)
 
 
 # Test Configuration
@@ -143,6 +210,7 @@ TEST_CONFIG = {
     "batch_size": 3,  # Small batch size to avoid rate limits
     "delay_between_tests": DELAY_BETWEEN_CALLS,
     "raise_exceptions": False,  # Don't raise exceptions for individual failures
+    "num_shards": os.cpu_count() or 1,  # Shards for evaluation.evaluate_sharded
 }
 
 
@@ -0,0 +1,119 @@
+"""Sharing of intermediate LLM results between RAGAS metrics.
+
+Several metrics ask the LLM the same intermediate question about a row: for
+example faithfulness and answer_correctness both extract statements from the
+answer with the same prompt. `MemoizedLLMWrapper` keys every generation on the
+rendered prompt (which carries the row's question, answer and contexts) plus the
+sampling settings, so within one evaluation pass each distinct intermediate
+artifact - extracted statements, generated questions, context verdicts - is
+requested upstream once and handed to every metric that needs it.
+"""
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from langchain_core.outputs import LLMResult
+from ragas.llms import LangchainLLMWrapper
+
+
+class EvaluationMemo:
+    """Per-pass store of LLM results plus call accounting."""
+
+    def __init__(self):
+        self.results: Dict[str, LLMResult] = {}
+        self.requested = 0
+        self.upstream = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt, n, temperature, stop) -> str:
+        raw = f"{prompt.to_string()}\x00{n}\x00{temperature}\x00{stop}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @property
+    def saved(self) -> int:
+        return self.requested - self.upstream
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requested": self.requested,
+            "upstream": self.upstream,
+            "saved": self.saved,
+            "saved_ratio": self.saved / self.requested if self.requested else 0.0,
+        }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (f"LLM calls: {stats['requested']} requested, {stats['upstream']} sent upstream, "
+                f"{stats['saved']} shared between metrics ({stats['saved_ratio']:.0%} saved)")
+
+    def clear(self):
+        """Forget stored results, e.g. before the next evaluation pass."""
+        with self._lock:
+            self.results.clear()
+            self._pending.clear()
+            self.requested = 0
+            self.upstream = 0
+
+
+class MemoizedLLMWrapper(LangchainLLMWrapper):
+    """LangchainLLMWrapper that answers repeated prompts from an `EvaluationMemo`.
+
+    Concurrent metrics asking the same question wait for the first request in
+    flight rather than issuing their own.
+    """
+
+    def __init__(self, langchain_llm, memo: Optional[EvaluationMemo] = None, **kwargs):
+        super().__init__(langchain_llm, **kwargs)
+        self.memo = memo if memo is not None else EvaluationMemo()
+
+    def generate_text(self, prompt, n=1, temperature=None, stop=None, callbacks=None):
+        key = self.memo.key(prompt, n, temperature, stop)
+        with self.memo._lock:
+            self.memo.requested += 1
+            if key in self.memo.results:
+                return self.memo.results[key]
+            self.memo.upstream += 1
+
+        result = super().generate_text(prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks)
+        with self.memo._lock:
+            self.memo.results[key] = result
+        return result
+
+    async def agenerate_text(self, prompt, n=1, temperature=None, stop=None, callbacks=None):
+        key = self.memo.key(prompt, n, temperature, stop)
+        with self.memo._lock:
+            self.memo.requested += 1
+            if key in self.memo.results:
+                return self.memo.results[key]
+            pending = self.memo._pending.get(key)
+            if pending is None:
+                self.memo.upstream += 1
+                owner = asyncio.get_running_loop().create_future()
+                self.memo._pending[key] = owner
+
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        try:
+            result = await super().agenerate_text(
+                prompt, n=n, temperature=temperature, stop=stop, callbacks=callbacks
+            )
+        except BaseException as e:
+            with self.memo._lock:
+                self.memo._pending.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                owner.set_exception(RuntimeError("Shared LLM request was cancelled"))
+            else:
+                owner.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged twice
+            owner.exception()
+            raise
+
+        with self.memo._lock:
+            self.memo.results[key] = result
+            self.memo._pending.pop(key, None)
+        owner.set_result(result)
+        return result
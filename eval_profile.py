@@ -0,0 +1,299 @@
+"""Per-metric cost profile of a RAGAS evaluation.
+
+`get_ragas_config(profiler=...)` hooks an `EvaluationProfiler` into the LLM
+(as a LangChain callback), the embeddings and the rate limiter it builds, and
+`profiler.profile(metrics)` tags every upstream call with the metric whose
+scoring made it. Per metric, and per prompt within it, the profiler records
+upstream calls, tokens and wall time; per metric it also records time queued on
+the rate limiter and retries. Wall time includes queueing and retry backoff.
+
+`flame()` renders the breakdown as an indented text flame graph, `folded()`
+writes it in the collapsed-stack format read by flamegraph.pl and speedscope,
+and `report()` / `save()` give the JSON.
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from retry import cohere_retry_policy
+
+UNATTRIBUTED = "(no metric)"
+EMBEDDINGS_FRAME = "embeddings"
+PROMPT_LABEL_LENGTH = 60
+# Scoring coroutine called once per row (ragas >= 0.2, then ragas 0.1)
+SCORING_METHODS = ("_single_turn_ascore", "_ascore")
+
+_current_metric = contextvars.ContextVar("current_metric", default=UNATTRIBUTED)
+
+
+def prompt_label(text: str) -> str:
+    """Short name for a prompt: the first non-empty line of its instruction."""
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            return line[:PROMPT_LABEL_LENGTH]
+    return "(empty prompt)"
+
+
+def token_usage(response) -> Tuple[int, int]:
+    """Input and output tokens reported in an LLMResult."""
+    input_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if not usage:
+                usage = (generation.generation_info or {}).get("token_count") or {}
+            input_tokens += int(usage.get("input_tokens") or 0)
+            output_tokens += int(usage.get("output_tokens") or 0)
+    return input_tokens, output_tokens
+
+
+class CallStats:
+    """Counters for one metric or one prompt of a metric."""
+
+    FIELDS = ("calls", "failed", "input_tokens", "output_tokens", "wall_s", "queue_s", "retries", "backoff_s")
+    __slots__ = FIELDS
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, **amounts):
+        for field, amount in amounts.items():
+            setattr(self, field, getattr(self, field) + amount)
+
+    def merge(self, other: "CallStats"):
+        self.add(**{field: getattr(other, field) for field in self.FIELDS})
+
+    def as_dict(self) -> Dict[str, float]:
+        return {field: round(getattr(self, field), 4) for field in self.FIELDS}
+
+
+class ProfilingCallbackHandler(BaseCallbackHandler):
+    """Times every LLM run and reads its token usage."""
+
+    # Run in the caller's context so the current metric is visible
+    run_inline = True
+
+    def __init__(self, profiler: "EvaluationProfiler"):
+        self.profiler = profiler
+        self._runs: Dict[Any, Tuple[str, str, float]] = {}
+
+    def _start(self, run_id, text):
+        self._runs[run_id] = (_current_metric.get(), prompt_label(text), time.perf_counter())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        content = messages[0][0].content if messages and messages[0] else ""
+        self._start(run_id, content if isinstance(content, str) else str(content))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, prompts[0] if prompts else "")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        metric, label, started = run
+        input_tokens, output_tokens = token_usage(response)
+        self.profiler.record(metric, label, calls=1, wall_s=time.perf_counter() - started,
+                             input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        metric, label, started = run
+        self.profiler.record(metric, label, calls=1, failed=1, wall_s=time.perf_counter() - started)
+
+
+class ProfiledRateLimiter(BaseRateLimiter):
+    """Rate limiter wrapper that records how long each caller queued."""
+
+    def __init__(self, rate_limiter: BaseRateLimiter, profiler: "EvaluationProfiler"):
+        self.rate_limiter = rate_limiter
+        self.profiler = profiler
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        start_time = time.perf_counter()
+        try:
+            return self.rate_limiter.acquire(blocking=blocking)
+        finally:
+            self.profiler.record(_current_metric.get(), None, queue_s=time.perf_counter() - start_time)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        start_time = time.perf_counter()
+        try:
+            return await self.rate_limiter.aacquire(blocking=blocking)
+        finally:
+            self.profiler.record(_current_metric.get(), None, queue_s=time.perf_counter() - start_time)
+
+
+class ProfiledEmbeddings(Embeddings):
+    """Embeddings wrapper that records every call under the current metric."""
+
+    def __init__(self, embeddings: Embeddings, profiler: "EvaluationProfiler"):
+        self.embeddings = embeddings
+        self.profiler = profiler
+
+    def _timed(self, func, *args):
+        start_time = time.perf_counter()
+        failed = 1
+        try:
+            result = func(*args)
+            failed = 0
+            return result
+        finally:
+            self.profiler.record(_current_metric.get(), EMBEDDINGS_FRAME, calls=1, failed=failed,
+                                 wall_s=time.perf_counter() - start_time)
+
+    async def _atimed(self, func, *args):
+        start_time = time.perf_counter()
+        failed = 1
+        try:
+            result = await func(*args)
+            failed = 0
+            return result
+        finally:
+            self.profiler.record(_current_metric.get(), EMBEDDINGS_FRAME, calls=1, failed=failed,
+                                 wall_s=time.perf_counter() - start_time)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._timed(self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._timed(self.embeddings.embed_query, text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._atimed(self.embeddings.aembed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._atimed(self.embeddings.aembed_query, text)
+
+
+class EvaluationProfiler:
+    """Collects per-metric call, token, time, queueing and retry counts."""
+
+    def __init__(self):
+        self.callback_handler = ProfilingCallbackHandler(self)
+        # metric -> prompt label (None for per-metric events) -> stats
+        self._frames: Dict[str, Dict[Optional[str], CallStats]] = {}
+        # metric -> [rows scored, seconds spent scoring them]
+        self._rows: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap_rate_limiter(self, rate_limiter: BaseRateLimiter) -> ProfiledRateLimiter:
+        return ProfiledRateLimiter(rate_limiter, self)
+
+    def wrap_embeddings(self, embeddings: Embeddings) -> ProfiledEmbeddings:
+        return ProfiledEmbeddings(embeddings, self)
+
+    def record(self, metric: str, frame: Optional[str], **amounts):
+        with self._lock:
+            frames = self._frames.setdefault(metric, {})
+            stats = frames.get(frame)
+            if stats is None:
+                stats = frames[frame] = CallStats()
+            stats.add(**amounts)
+
+    def _on_retry(self, error: BaseException, delay: float):
+        self.record(_current_metric.get(), None, retries=1, backoff_s=delay)
+
+    def _tagged(self, name: str, score):
+        @functools.wraps(score)
+        async def tagged(*args, **kwargs):
+            token = _current_metric.set(name)
+            start_time = time.perf_counter()
+            try:
+                return await score(*args, **kwargs)
+            finally:
+                _current_metric.reset(token)
+                with self._lock:
+                    rows = self._rows.setdefault(name, [0, 0.0])
+                    rows[0] += 1
+                    rows[1] += time.perf_counter() - start_time
+        return tagged
+
+    @contextmanager
+    def profile(self, metrics):
+        """Attribute upstream calls made while scoring `metrics` to each metric."""
+        policy = cohere_retry_policy()
+        policy.on_retry.append(self._on_retry)
+        patched = []
+        for metric in metrics:
+            for method in SCORING_METHODS:
+                score = getattr(metric, method, None)
+                if score is not None:
+                    setattr(metric, method, self._tagged(metric.name, score))
+                    patched.append((metric, method))
+                    break
+        try:
+            yield self
+        finally:
+            for metric, method in patched:
+                delattr(metric, method)
+            policy.on_retry.remove(self._on_retry)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._rows.clear()
+
+    def report(self) -> Dict[str, Any]:
+        """JSON-ready totals per metric, with a per-prompt breakdown."""
+        metrics = {}
+        overall = CallStats()
+        with self._lock:
+            for metric in sorted(set(self._frames) | set(self._rows)):
+                total = CallStats()
+                prompts = {}
+                for frame, stats in self._frames.get(metric, {}).items():
+                    total.merge(stats)
+                    if frame is not None:
+                        prompts[frame] = stats.as_dict()
+                overall.merge(total)
+                rows, score_s = self._rows.get(metric, (0, 0.0))
+                metrics[metric] = {"rows": rows, "score_s": round(score_s, 4), **total.as_dict(),
+                                   "prompts": prompts}
+        return {"metrics": metrics, "total": overall.as_dict()}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def folded(self) -> str:
+        """Wall milliseconds as "metric;prompt value" lines for flamegraph.pl."""
+        lines = []
+        for metric, entry in self.report()["metrics"].items():
+            for label, stats in entry["prompts"].items():
+                frames = ";".join(name.replace(";", ",") for name in (metric, label))
+                lines.append(f"{frames} {round(stats['wall_s'] * 1000)}")
+        return "\n".join(lines)
+
+    def flame(self, width: int = 30) -> str:
+        """Text flame graph: metrics by wall time, each with its prompts below."""
+        report = self.report()
+        grand_total = report["total"]["wall_s"] or 1.0
+
+        def line(depth, name, stats, extra=""):
+            bar = "█" * max(1, round(width * stats["wall_s"] / grand_total)) if stats["wall_s"] else ""
+            tokens = stats["input_tokens"] + stats["output_tokens"]
+            label = ("  " * depth + name)[:PROMPT_LABEL_LENGTH + 4]
+            return (f"{label:<{PROMPT_LABEL_LENGTH + 4}} {stats['wall_s']:8.2f}s "
+                    f"{stats['wall_s'] / grand_total:4.0%} {bar:<{width}} "
+                    f"calls {stats['calls']:<4} tokens {tokens:<7}{extra}").rstrip()
+
+        lines = []
+        for metric, entry in sorted(report["metrics"].items(), key=lambda item: -item[1]["wall_s"]):
+            lines.append(line(0, metric, entry, f" queued {entry['queue_s']:.2f}s retries {entry['retries']}"
+                                                f" rows {entry['rows']}"))
+            for label, stats in sorted(entry["prompts"].items(), key=lambda item: -item[1]["wall_s"]):
+                lines.append(line(1, label, stats))
+        return "\n".join(lines)
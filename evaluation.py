@@ -0,0 +1,302 @@
+"""Sharded RAGAS evaluation across processes and machines.
+
+The dataset is split into contiguous shards, each shard is evaluated with the
+normal `ragas.evaluate` in its own process, and the per-row results are merged
+back in order. All workers share one `RateLimitCoordinator`, so the API quota is
+respected no matter how many processes or machines take part.
+
+Single machine:
+    result = evaluate_sharded(dataset, [faithfulness, answer_relevancy])
+
+Several machines (every process needs the same RATE_LIMIT_AUTHKEY secret):
+    python evaluation.py coordinator --host 0.0.0.0 --port 50000
+    python evaluation.py shard data.jsonl --index 0 --num-shards 4 \\
+        --metrics faithfulness,answer_relevancy --coordinator host:50000 --out shard0.jsonl
+    python evaluation.py merge shard*.jsonl --metrics faithfulness,answer_relevancy
+"""
+import argparse
+import json
+import secrets
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import ragas.metrics
+from datasets import Dataset
+from ragas import evaluate
+
+from config import COHERE_TRIAL_RATE_LIMIT, RATE_LIMIT_AUTHKEY, TEST_CONFIG, get_ragas_config
+from rate_limiter import CoordinatedRateLimiter, is_loopback, start_coordinator
+
+
+def metric_attribute_name(metric) -> str:
+    """Name under which a metric instance is exported from `ragas.metrics`.
+
+    Workers re-import metrics by this name instead of pickling the instance,
+    which may hold an LLM client.
+    """
+    if isinstance(metric, str):
+        return metric
+    for name, value in vars(ragas.metrics).items():
+        if value is metric:
+            return name
+    raise ValueError(f"Metric {metric!r} is not exported from ragas.metrics")
+
+
+def metric_columns(metric_names: Sequence[str]) -> List[str]:
+    """Result column names for the given `ragas.metrics` attribute names."""
+    return [getattr(ragas.metrics, name).name for name in metric_names]
+
+
+def shard_bounds(num_rows: int, num_shards: int) -> List[Tuple[int, int]]:
+    """Split range(num_rows) into at most num_shards contiguous, balanced slices."""
+    num_shards = max(1, min(num_shards, num_rows))
+    size, extra = divmod(num_rows, num_shards)
+    bounds = []
+    start = 0
+    for index in range(num_shards):
+        end = start + size + (1 if index < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def evaluate_shard(data: Dict[str, list],
+                   metric_names: Sequence[str],
+                   coordinator_address: Optional[Tuple[str, int]] = None,
+                   raise_exceptions: bool = TEST_CONFIG["raise_exceptions"]) -> pd.DataFrame:
+    """Evaluate one shard (column dict) and return its per-row result frame."""
+    rate_limiter = CoordinatedRateLimiter(coordinator_address) if coordinator_address else None
+    ragas_config = get_ragas_config(rate_limiter)
+    metrics = [getattr(ragas.metrics, name) for name in metric_names]
+
+    result = evaluate(
+        Dataset.from_dict(data),
+        metrics=metrics,
+        llm=ragas_config["llm"],
+        embeddings=ragas_config["embeddings"],
+        raise_exceptions=raise_exceptions,
+        run_config=ragas_config["run_config"]
+    )
+    return result.to_pandas()
+
+
+# Input columns and the names ragas >= 0.2 gives them in `result.to_pandas()`
+RESULT_COLUMN_NAMES = {
+    "question": "user_input",
+    "answer": "response",
+    "contexts": "retrieved_contexts",
+    "ground_truth": "reference",
+}
+
+
+def _failed_shard_frame(data: Dict[str, list], columns: Sequence[str],
+                        like: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Stand-in result for a shard whose worker died: every score is missing.
+
+    With `like`, a frame from a shard that succeeded, the input columns are
+    renamed the way ragas named them there, so the merged rows line up.
+    """
+    frame = pd.DataFrame(data)
+    if like is not None:
+        frame = frame.rename(columns={name: renamed for name, renamed in RESULT_COLUMN_NAMES.items()
+                                      if name not in like.columns and renamed in like.columns})
+    for column in columns:
+        frame[column] = float("nan")
+    return frame if like is None else frame.reindex(columns=like.columns)
+
+
+class ShardedEvaluationResult:
+    """Merged per-row scores of a sharded run, with per-metric aggregates.
+
+    `scores` are NaN-skipping means, exactly as `ragas.evaluate` reports them,
+    and `failures` counts the rows whose score is missing for each metric.
+    """
+
+    def __init__(self, frames: Sequence[pd.DataFrame], columns: Sequence[str]):
+        self.frame = pd.concat(list(frames), ignore_index=True) if frames else pd.DataFrame()
+        self.metric_columns = list(columns)
+        for column in self.metric_columns:
+            if column not in self.frame.columns:
+                self.frame[column] = float("nan")
+
+        self.scores = {column: float(self.frame[column].mean()) for column in self.metric_columns}
+        self.failures = {column: int(self.frame[column].isna().sum()) for column in self.metric_columns}
+
+    def to_pandas(self) -> pd.DataFrame:
+        return self.frame.copy()
+
+    def __getitem__(self, key: str) -> float:
+        return self.scores[key]
+
+    def __repr__(self) -> str:
+        return repr(self.scores)
+
+
+def evaluate_sharded(dataset: Dataset,
+                     metrics: Sequence[Any],
+                     num_shards: Optional[int] = None,
+                     max_workers: Optional[int] = None,
+                     coordinator_address: Optional[Tuple[str, int]] = None,
+                     calls_per_minute: float = COHERE_TRIAL_RATE_LIMIT,
+                     raise_exceptions: bool = TEST_CONFIG["raise_exceptions"]) -> ShardedEvaluationResult:
+    """Evaluate `dataset` in parallel shards and merge the results.
+
+    Without `coordinator_address` a coordinator is started for the duration of
+    the run, limited to `calls_per_minute` across all workers.
+    """
+    metric_names = [metric_attribute_name(metric) for metric in metrics]
+    columns = metric_columns(metric_names)
+    num_shards = num_shards or TEST_CONFIG["num_shards"]
+    shards = [dataset.select(range(start, end)).to_dict()
+              for start, end in shard_bounds(len(dataset), num_shards)]
+
+    coordinator = None
+    if coordinator_address is None:
+        coordinator = start_coordinator(calls_per_minute=calls_per_minute)
+        coordinator_address = coordinator.address
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers or len(shards)) as executor:
+            futures = [
+                executor.submit(evaluate_shard, shard, metric_names, coordinator_address, raise_exceptions)
+                for shard in shards
+            ]
+            frames = []
+            for index, future in enumerate(futures):
+                try:
+                    frames.append(future.result())
+                except Exception:
+                    if raise_exceptions:
+                        raise
+                    print(f"Shard {index} failed, counting its rows as failures:")
+                    traceback.print_exc()
+                    frames.append(None)
+    finally:
+        if coordinator is not None:
+            coordinator.shutdown()
+
+    # Failed shards take their columns from one that succeeded
+    like = next((frame for frame in frames if frame is not None), None)
+    frames = [_failed_shard_frame(shard, columns, like) if frame is None else frame
+              for shard, frame in zip(shards, frames)]
+    return ShardedEvaluationResult(frames, columns)
+
+
+def build_ragas_dataset(assistant,
+                        questions: Sequence[str],
+                        ground_truths: Optional[Sequence[str]] = None,
+                        raise_exceptions: bool = TEST_CONFIG["raise_exceptions"]) -> Dataset:
+    """Ask `assistant` each question and record its answer and retrieved contexts.
+
+    Each question is answered without conversation history, and the contexts
+    the assistant's retriever injected become the `contexts` column. A question
+    whose reply fails is left out and counted, rather than scored with an
+    error message as its answer.
+    """
+    data = {"question": [], "answer": [], "contexts": []}
+    if ground_truths is not None:
+        data["ground_truth"] = []
+    failures = 0
+    # Cached answers come without contexts, so always generate
+    semantic_cache, assistant.semantic_cache = assistant.semantic_cache, None
+    try:
+        for index, question in enumerate(questions):
+            try:
+                answer, contexts = assistant.complete(question)
+            except Exception:
+                if raise_exceptions:
+                    raise
+                failures += 1
+                print(f"Question {index} failed, leaving it out of the dataset:")
+                traceback.print_exc()
+                continue
+            data["question"].append(question)
+            data["answer"].append(answer)
+            data["contexts"].append(list(contexts))
+            if ground_truths is not None:
+                data["ground_truth"].append(ground_truths[index])
+    finally:
+        assistant.semantic_cache = semantic_cache
+
+    if failures:
+        print(f"{failures} of {len(questions)} questions failed and were left out")
+    return Dataset.from_dict(data)
+
+
+def _load_jsonl(path: str) -> Dict[str, list]:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return {key: [row[key] for row in rows] for key in rows[0]} if rows else {}
+
+
+def _parse_address(value: str) -> Tuple[str, int]:
+    host, port = value.rsplit(":", 1)
+    return host, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded RAGAS evaluation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator_cmd = commands.add_parser("coordinator", help="Serve a shared rate limiter")
+    coordinator_cmd.add_argument("--host", default="127.0.0.1",
+                                 help="Address to listen on; non-loopback needs RATE_LIMIT_AUTHKEY")
+    coordinator_cmd.add_argument("--port", type=int, default=50000)
+    coordinator_cmd.add_argument("--calls-per-minute", type=float, default=COHERE_TRIAL_RATE_LIMIT)
+
+    shard_cmd = commands.add_parser("shard", help="Evaluate one shard of a JSONL dataset")
+    shard_cmd.add_argument("dataset")
+    shard_cmd.add_argument("--index", type=int, required=True)
+    shard_cmd.add_argument("--num-shards", type=int, required=True)
+    shard_cmd.add_argument("--metrics", required=True, help="Comma-separated ragas.metrics names")
+    shard_cmd.add_argument("--coordinator", help="host:port of a running coordinator")
+    shard_cmd.add_argument("--out", required=True)
+
+    merge_cmd = commands.add_parser("merge", help="Merge shard outputs into one result")
+    merge_cmd.add_argument("shards", nargs="+", help="Shard outputs, in shard order")
+    merge_cmd.add_argument("--metrics", required=True)
+    merge_cmd.add_argument("--out")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "coordinator":
+        authkey = RATE_LIMIT_AUTHKEY
+        if authkey is None:
+            if not is_loopback(args.host):
+                parser.error(f"set RATE_LIMIT_AUTHKEY to a shared secret to listen on {args.host}")
+            # Shard processes are not our children, so they need the key spelled out
+            authkey = secrets.token_hex(16).encode()
+            print(f"Run the shards with RATE_LIMIT_AUTHKEY={authkey.decode()}")
+        manager = start_coordinator((args.host, args.port), args.calls_per_minute, authkey)
+        print(f"Rate limit coordinator on {args.host}:{args.port} "
+              f"({args.calls_per_minute:g} calls/min). Ctrl-C to stop.")
+        try:
+            manager.join()
+        except KeyboardInterrupt:
+            manager.shutdown()
+
+    elif args.command == "shard":
+        data = _load_jsonl(args.dataset)
+        num_rows = len(next(iter(data.values()), []))
+        start, end = shard_bounds(num_rows, args.num_shards)[args.index]
+        shard = {key: values[start:end] for key, values in data.items()}
+        address = _parse_address(args.coordinator) if args.coordinator else None
+        if address and RATE_LIMIT_AUTHKEY is None:
+            parser.error("set RATE_LIMIT_AUTHKEY to the coordinator's key")
+        frame = evaluate_shard(shard, args.metrics.split(","), address)
+        frame.to_json(args.out, orient="records", lines=True)
+        print(f"Shard {args.index}: rows {start}-{end} written to {args.out}")
+
+    elif args.command == "merge":
+        frames = [pd.read_json(path, orient="records", lines=True) for path in args.shards]
+        result = ShardedEvaluationResult(frames, metric_columns(args.metrics.split(",")))
+        for column in result.metric_columns:
+            print(f"{column}: {result.scores[column]:.3f} ({result.failures[column]} failed)")
+        if args.out:
+            result.frame.to_json(args.out, orient="records", lines=True)
+
+
+if __name__ == "__main__":
+    main()
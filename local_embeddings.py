@@ -0,0 +1,63 @@
+"""Offline embeddings backend for quick regression runs.
+
+Texts are hashed into sparse word and character n-gram counts (no vocabulary
+to fit), log-scaled, and projected to a small dense vector with a fixed sparse
+random projection. Nothing is learned or downloaded, the same text always gets
+the same vector, and everything runs on the CPU, batched across threads.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from langchain_core.embeddings import Embeddings
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.random_projection import SparseRandomProjection
+
+from batch_scoring import normalize_rows
+from config import EMBED_BATCH_SIZE, LOCAL_EMBED_DIM
+
+
+class LocalHashingEmbeddings(Embeddings):
+    """Hashing + random projection embeddings, compatible with LangchainEmbeddingsWrapper."""
+
+    def __init__(self,
+                 dim: int = LOCAL_EMBED_DIM,
+                 n_features: int = 2 ** 18,
+                 batch_size: int = EMBED_BATCH_SIZE * 10,
+                 max_workers: Optional[int] = None,
+                 random_state: int = 0):
+        self.dim = dim
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        # Word unigrams/bigrams carry meaning, char n-grams absorb typos and inflections
+        self.vectorizers = [
+            HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm=None),
+            HashingVectorizer(n_features=n_features, analyzer="char_wb", ngram_range=(3, 5),
+                              alternate_sign=False, norm=None),
+        ]
+        self.projection = SparseRandomProjection(n_components=dim, dense_output=True, random_state=random_state)
+        # The projection only depends on the input width, so fit it on an empty row
+        self.projection.fit(sp.csr_matrix((1, len(self.vectorizers) * n_features), dtype=np.float32))
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an L2-normalized (len(texts), dim) float32 matrix."""
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            parts = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                parts = list(executor.map(self._embed_batch, batches))
+        return np.vstack(parts) if parts else np.empty((0, self.dim), dtype=np.float32)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        counts = sp.hstack([vectorizer.transform(texts) for vectorizer in self.vectorizers],
+                           format="csr", dtype=np.float32)
+        counts.data = np.log1p(counts.data)  # sublinear term frequency
+        return normalize_rows(self.projection.transform(counts).astype(np.float32, copy=False))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
@@ -1,9 +1,173 @@
 """Run the AI Assistant."""
+import argparse
+import asyncio
+import signal
+import threading
 from assistant import Assistant
+from config import (RETRIEVAL_INDEX_DIR, SEMANTIC_CACHE_ENABLED, WARM_UP_CONNECTION,
+                    BATCH_CONCURRENCY, COHERE_TRIAL_RATE_LIMIT, get_embeddings)
+
+
+def load_retriever():
+    """Load the saved retrieval index, if one has been built."""
+    from retrieval import INDEX_FILE, Retriever
+
+    if not (RETRIEVAL_INDEX_DIR / INDEX_FILE).exists():
+        return None
+    return Retriever.load(RETRIEVAL_INDEX_DIR, get_embeddings())
+
+
+def load_semantic_cache():
+    """Create the semantic response cache unless it is disabled."""
+    from semantic_cache import SemanticCache
+
+    return SemanticCache(get_embeddings()) if SEMANTIC_CACHE_ENABLED else None
+
+
+def load_components(assistant):
+    """Attach the retriever and semantic cache, importing FAISS on first use."""
+    assistant.retriever = load_retriever()
+    assistant.semantic_cache = load_semantic_cache()
+
+
+def in_background(func, *args):
+    """Run func in a daemon thread while the prompt waits for input."""
+    thread = threading.Thread(target=func, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def read_lines(loop, lines):
+    """Feed input() lines to the event loop from a daemon thread; None means EOF."""
+    while True:
+        try:
+            line = input("\n💬 You: ")
+        except EOFError:
+            line = None
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+        if line is None:
+            return
+
+
+async def repl(assistant, loader=None):
+    """Read commands while chat and summarize requests run in the background.
+
+    Ctrl-C or /cancel cancels the requests in flight; Ctrl-C with nothing in
+    flight exits.
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    in_flight = set()
+    warm_up = asyncio.create_task(assistant.awarm_up()) if WARM_UP_CONNECTION else None
+
+    def cancel_in_flight():
+        for task in list(in_flight):
+            task.cancel()
+        return len(in_flight)
+
+    def on_interrupt():
+        if not cancel_in_flight():
+            lines.put_nowait('/quit')
+
+    def on_done(task, label):
+        in_flight.discard(task)
+        if task.cancelled():
+            print(f"\n⏹ {label} cancelled")
+            return
+        print(f"\n🤖 {label}: {task.result()}")
+
+    def start(coro, label):
+        task = asyncio.create_task(coro)
+        in_flight.add(task)
+        task.add_done_callback(lambda t: on_done(t, label))
+
+    async def chat(message):
+        if loader is not None:
+            await asyncio.to_thread(loader.join)
+        return await assistant.achat(message)
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+    except NotImplementedError:
+        signal.signal(signal.SIGINT, lambda *args: loop.call_soon_threadsafe(on_interrupt))
+
+    threading.Thread(target=read_lines, args=(loop, lines), daemon=True).start()
+
+    while True:
+        line = await lines.get()
+        if line is None:
+            line = '/quit'
+        user_input = line.strip()
+
+        if not user_input:
+            continue
+
+        # Handle commands
+        if user_input == '/quit':
+            cancel_in_flight()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            if warm_up is not None:
+                warm_up.cancel()
+            print("👋 Goodbye!")
+            break
+        elif user_input == '/help':
+            print("\nCommands:")
+            print("/help - Show this help")
+            print("/clear - Clear chat history")
+            print("/save - Save conversation")
+            print("/summarize <text> - Summarize text")
+            print("/cancel - Cancel requests in progress (or press Ctrl-C)")
+            print("/quit - Exit")
+        elif user_input == '/cancel':
+            if not cancel_in_flight():
+                print("Nothing to cancel")
+        elif user_input == '/clear':
+            print(assistant.clear_history())
+        elif user_input == '/save':
+            print(assistant.save_chat())
+        elif user_input.startswith('/summarize '):
+            text = user_input[11:].strip()
+            if text:
+                start(assistant.asummarize(text), "Summary")
+            else:
+                print("Please provide text to summarize")
+        else:
+            # Regular chat
+            start(chat(user_input), "Assistant")
+
+
+def run_batch_mode(args):
+    """Push a JSONL file of jobs through the assistant (see batch.py)."""
+    import batch
+    from rate_limiter import RateLimiter
+
+    try:
+        assistant = Assistant(rate_limiter=RateLimiter(args.rate))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    load_components(assistant)
+    batch.main(assistant, args.batch, args.out, args.concurrency, ordered=not args.unordered)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cohere AI Assistant")
+    parser.add_argument("--batch", metavar="IN", help="Run JSONL jobs from a file ('-' for stdin)")
+    parser.add_argument("--out", default="-", help="JSONL results file, appended to and resumed ('-' for stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=COHERE_TRIAL_RATE_LIMIT, help="Max calls per minute")
+    parser.add_argument("--unordered", action="store_true", help="Write results as they finish")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.batch:
+        run_batch_mode(args)
+        return
 
-def main():
     print("🤖 Simple Cohere AI Assistant")
-    print("Commands: /help, /clear, /save, /summarize <text>, /quit")
+    print("Commands: /help, /clear, /save, /summarize <text>, /cancel, /quit")
     print("-" * 50)
 
     try:
@@ -13,48 +177,17 @@ def main():
         print("Get your API key from: https://dashboard.cohere.ai/")
         return
 
-    while True:
-        try:
-            user_input = input("\n💬 You: ").strip()
-
-            if not user_input:
-                continue
-
-            # Handle commands
-            if user_input == '/quit':
-                print("👋 Goodbye!")
-                break
-            elif user_input == '/help':
-                print("\nCommands:")
-                print("/help - Show this help")
-                print("/clear - Clear chat history")
-                print("/save - Save conversation")
-                print("/summarize <text> - Summarize text")
-                print("/quit - Exit")
-                continue
-            elif user_input == '/clear':
-                print(assistant.clear_history())
-                continue
-            elif user_input == '/save':
-                print(assistant.save_chat())
-                continue
-            elif user_input.startswith('/summarize '):
-                text = user_input[11:].strip()
-                if text:
-                    print(f"🤖 Summary: {assistant.summarize(text)}")
-                else:
-                    print("Please provide text to summarize")
-                continue
-
-            # Regular chat
-            response = assistant.chat(user_input)
-            print(f"🤖 Assistant: {response}")
+    # Load lazy modules while the user types the first message
+    if WARM_UP_CONNECTION:
+        loader = in_background(load_components, assistant)
+    else:
+        load_components(assistant)
+        loader = None
 
-        except KeyboardInterrupt:
-            print("\n👋 Goodbye!")
-            break
-        except Exception as e:
-            print(f"❌ Error: {str(e)}")
+    try:
+        asyncio.run(repl(assistant, loader))
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""Rate limiting for Cohere calls shared across threads, processes and machines."""
+import asyncio
+import ipaddress
+import threading
+import time
+from multiprocessing.managers import BaseManager
+from typing import Optional, Tuple
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from config import COHERE_TRIAL_RATE_LIMIT, RATE_LIMIT_AUTHKEY
+
+
+class RateLimiter(BaseRateLimiter):
+    """Spaces calls evenly so that at most `calls_per_minute` start per minute.
+
+    Every caller reserves the next free slot and then sleeps until it comes
+    round, so the limiter can be shared by threads, asyncio tasks and (through
+    `RateLimitCoordinator`) other processes without busy-waiting.
+    """
+
+    def __init__(self, calls_per_minute: float = COHERE_TRIAL_RATE_LIMIT):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive")
+        self.interval = 60.0 / calls_per_minute
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, blocking: bool = True) -> Optional[float]:
+        """Reserve the next call slot and return how long to wait for it.
+
+        With blocking=False nothing is reserved unless a slot is free right now,
+        in which case 0.0 is returned; otherwise None.
+        """
+        reserved = self._reserve(blocking)
+        return None if reserved is None else reserved[1]
+
+    def _reserve(self, blocking: bool) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if not blocking and slot > now:
+                return None
+            self._next_slot = slot + self.interval
+            return slot, slot - now
+
+    def release(self, slot: float):
+        """Give back a reserved slot that will not be used.
+
+        Only the most recently reserved slot can be returned; earlier ones are
+        already followed by other callers' reservations.
+        """
+        with self._lock:
+            if self._next_slot == slot + self.interval:
+                self._next_slot = slot
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        delay = self.reserve(blocking)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        reserved = self._reserve(blocking)
+        if reserved is None:
+            return False
+        slot, delay = reserved
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # A cancelled request should not use up the quota
+                self.release(slot)
+                raise
+        return True
+
+
+class RateLimitCoordinator(BaseManager):
+    """Serves one `RateLimiter` to every process that connects to it.
+
+    Start it once (``python evaluation.py coordinator``, or automatically for a
+    local process pool) and point workers on any machine at its address.
+    """
+
+
+_shared_limiter: Optional[RateLimiter] = None
+
+
+def _get_shared_limiter(calls_per_minute: float = COHERE_TRIAL_RATE_LIMIT) -> RateLimiter:
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = RateLimiter(calls_per_minute)
+    return _shared_limiter
+
+
+RateLimitCoordinator.register("get_limiter", callable=_get_shared_limiter)
+
+
+def is_loopback(host: str) -> bool:
+    """Whether `host` is only reachable from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def start_coordinator(address: Tuple[str, int] = ("127.0.0.1", 0),
+                      calls_per_minute: float = COHERE_TRIAL_RATE_LIMIT,
+                      authkey: Optional[bytes] = RATE_LIMIT_AUTHKEY) -> RateLimitCoordinator:
+    """Start a coordinator in a background process and return its manager.
+
+    Clients are unpickled by the coordinator, so anyone holding the authkey can
+    run code on its host. Without an explicit `authkey` the current process's
+    random one is used, which only its child processes inherit, and the
+    coordinator may only listen on a loopback address.
+    """
+    if authkey is None and not is_loopback(address[0]):
+        raise ValueError(f"Refusing to serve the rate limit coordinator on {address[0]} without "
+                         f"an authkey; set RATE_LIMIT_AUTHKEY to a secret shared with the workers")
+    manager = RateLimitCoordinator(address=address, authkey=authkey)
+    manager.start()
+    # Create the limiter with the requested rate before any worker asks for it
+    manager.get_limiter(calls_per_minute)
+    return manager
+
+
+class CoordinatedRateLimiter(BaseRateLimiter):
+    """Client for a limiter served by a `RateLimitCoordinator`.
+
+    Only the slot reservation goes over the wire; the wait happens locally so
+    the coordinator never blocks on a sleeping caller.
+    """
+
+    def __init__(self, address: Tuple[str, int], authkey: Optional[bytes] = RATE_LIMIT_AUTHKEY):
+        self.address = tuple(address)
+        # None means the process authkey, which worker processes inherit
+        self.authkey = authkey
+        self._remote = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Proxies are tied to their connection; reconnect after pickling
+        return {"address": self.address, "authkey": self.authkey}
+
+    def __setstate__(self, state):
+        self.__init__(state["address"], state["authkey"])
+
+    def reserve(self, blocking: bool = True) -> Optional[float]:
+        with self._lock:
+            if self._remote is None:
+                manager = RateLimitCoordinator(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._remote = manager.get_limiter()
+            return self._remote.reserve(blocking)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        delay = self.reserve(blocking)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        delay = await asyncio.to_thread(self.reserve, blocking)
+        if delay is None:
+            return False
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return True
+
@@ -0,0 +1,137 @@
+"""FAISS-backed retrieval of context chunks for grounded chat.
+
+Chunks are embedded, L2-normalized and stored in a FAISS inner-product index,
+so search scores are cosine similarities. The index and its chunk texts are
+saved side by side in a directory; loading memory-maps the index so large
+corpora do not have to be read into RAM up front.
+"""
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from batch_scoring import embed_in_batches, normalize_rows
+from config import RETRIEVAL_INDEX_FACTORY, RETRIEVAL_TOP_K, get_embeddings
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+class Retriever:
+    """Top-k context search over a growing corpus of text chunks."""
+
+    def __init__(self, embeddings, index=None, chunks: Optional[List[str]] = None,
+                 index_factory: str = RETRIEVAL_INDEX_FACTORY):
+        self.embeddings = embeddings
+        self.index = index
+        self.chunks = chunks if chunks is not None else []
+        self.index_factory = index_factory
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def add(self, texts: Sequence[str], vectors: Optional[np.ndarray] = None):
+        """Embed and index more chunks; precomputed `vectors` skip the embedding call."""
+        texts = list(texts)
+        if not texts:
+            return
+        if vectors is None:
+            vectors = embed_in_batches(self.embeddings, texts)
+        vectors = normalize_rows(np.array(vectors, dtype=np.float32))
+        if len(vectors) != len(texts):
+            raise ValueError("texts and vectors must have the same length")
+
+        if self.index is None:
+            self.index = faiss.index_factory(vectors.shape[1], self.index_factory, faiss.METRIC_INNER_PRODUCT)
+        if not self.index.is_trained:
+            # IVF-style indexes learn their partitions from the first batch
+            self.index.train(vectors)
+        self.index.add(vectors)
+        self.chunks.extend(texts)
+
+    def search_batch(self, queries: Sequence[str], k: int = RETRIEVAL_TOP_K) -> List[List[Tuple[str, float]]]:
+        """Return the k best (chunk, score) pairs for each query."""
+        if self.index is None or not self.chunks:
+            return [[] for _ in queries]
+        vectors = normalize_rows(embed_in_batches(self.embeddings, list(queries)))
+        return self.search_vectors(vectors, k)
+
+    def search_vectors(self, vectors: np.ndarray, k: int = RETRIEVAL_TOP_K) -> List[List[Tuple[str, float]]]:
+        """Search with already normalized query vectors."""
+        scores, ids = self.index.search(np.ascontiguousarray(vectors, dtype=np.float32), min(k, len(self.chunks)))
+        return [
+            [(self.chunks[i], float(score)) for i, score in zip(row_ids, row_scores) if i >= 0]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[str]:
+        """Return the texts of the k chunks most similar to `query`."""
+        return [chunk for chunk, _ in self.search_batch([query], k)[0]]
+
+    def save(self, directory):
+        """Write the index and chunk texts to `directory`."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.index, str(directory / INDEX_FILE))
+        with open(directory / CHUNKS_FILE, 'w') as f:
+            for chunk in self.chunks:
+                f.write(json.dumps(chunk) + "\n")
+
+    @classmethod
+    def load(cls, directory, embeddings, mmap: bool = True) -> "Retriever":
+        """Load a saved retriever; with mmap=True the index is memory-mapped read-only.
+
+        Load with mmap=False to keep adding chunks to the index.
+        """
+        directory = Path(directory)
+        flags = 0
+        if mmap:
+            # IO_FLAG_MMAP covers inverted lists; flat codes need IO_FLAG_MMAP_IFC (faiss >= 1.8)
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        index = faiss.read_index(str(directory / INDEX_FILE), flags)
+        with open(directory / CHUNKS_FILE) as f:
+            chunks = [json.loads(line) for line in f]
+        return cls(embeddings, index, chunks)
+
+
+def build_retriever(texts: Sequence[str], embeddings=None) -> Retriever:
+    """Build a retriever over `texts`, using the configured embeddings by default."""
+    if embeddings is None:
+        embeddings = get_embeddings()
+    retriever = Retriever(embeddings)
+    retriever.add(texts)
+    return retriever
+
+
+def main(argv=None):
+    import argparse
+    from config import RETRIEVAL_INDEX_DIR, TEST_CONTEXTS
+
+    parser = argparse.ArgumentParser(description="Build or extend the retrieval index")
+    parser.add_argument("files", nargs="*", help="Text files, one chunk per non-empty line "
+                                                 "(defaults to config.TEST_CONTEXTS)")
+    parser.add_argument("--index-dir", default=str(RETRIEVAL_INDEX_DIR))
+    parser.add_argument("--append", action="store_true", help="Add to an existing index")
+    args = parser.parse_args(argv)
+
+    texts = []
+    for path in args.files:
+        with open(path) as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    if not args.files:
+        texts = list(TEST_CONTEXTS)
+
+    embeddings = get_embeddings()
+    if args.append and (Path(args.index_dir) / INDEX_FILE).exists():
+        retriever = Retriever.load(args.index_dir, embeddings, mmap=False)
+    else:
+        retriever = Retriever(embeddings)
+    retriever.add(texts)
+    retriever.save(args.index_dir)
+    print(f"Indexed {len(texts)} chunks ({len(retriever)} total) in {args.index_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Shared retry engine for Cohere calls.
+
+Errors are classified by exception type and HTTP status rather than by
+searching their message:
+
+- rate limited (429): retried after the server's Retry-After when given
+- transient (408, 409, 5xx, timeouts, connection errors): retried with backoff
+- anything else: raised immediately
+
+Backoff uses decorrelated jitter, so clients that failed together do not retry
+together. A circuit breaker shared by every call site opens after repeated
+transient failures and fails calls fast until the upstream has had time to
+recover, instead of queueing more doomed requests.
+"""
+import asyncio
+import functools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional
+
+from langchain_cohere import ChatCohere
+from langchain_core.embeddings import Embeddings
+from langchain_core.rate_limiters import BaseRateLimiter
+from pydantic import Field
+
+from config import (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+TRANSIENT_STATUSES = {408, 409, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Cohere API unavailable, not retrying for {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a Cohere SDK or httpx error, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from a Retry-After header."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error: BaseException) -> str:
+    """Return RATE_LIMITED, TRANSIENT or FATAL for an exception."""
+    status = status_code(error)
+    if status == 429:
+        return RATE_LIMITED
+    if status is not None:
+        return TRANSIENT if status in TRANSIENT_STATUSES else FATAL
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return TRANSIENT
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):  # timeouts, connect and read errors
+            return TRANSIENT
+    except ImportError:
+        pass
+    return FATAL
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive transient failures.
+
+    While open every call fails fast; after `reset_timeout` one trial call is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError(max(0.0, self.reset_timeout - waited))
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_neutral(self):
+        """A call that said nothing about upstream health (e.g. a 4xx) finished."""
+        with self._lock:
+            self._trial_running = False
+
+
+class RetryPolicy:
+    """Retries calls per the module rules; use call/acall or as a decorator."""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.attempts = 0
+        self.retries = 0
+        self.failed_attempts = 0
+        self.short_circuited = 0
+        # Called as listener(error, delay) before each retry, e.g. by eval_profile
+        self.on_retry: List[Callable[[BaseException, float], None]] = []
+
+    def next_delay(self, previous: float, error: BaseException) -> float:
+        """Decorrelated jitter, overridden by the server's Retry-After."""
+        requested = retry_after(error)
+        if requested is not None:
+            return requested
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    def _on_error(self, error: BaseException, attempt: int, delay: float) -> Optional[float]:
+        """Record a failed attempt; return the delay before retrying, or None to raise."""
+        self.failed_attempts += 1
+        kind = classify(error)
+        if kind == TRANSIENT:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_neutral()
+        if kind == FATAL or attempt >= self.max_attempts:
+            return None
+        self.retries += 1
+        delay = self.next_delay(delay, error)
+        for listener in self.on_retry:
+            listener(error, delay)
+        return delay
+
+    def _before_attempt(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.short_circuited += 1
+            raise
+        self.attempts += 1
+
+    def call(self, func, *args, **kwargs):
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            self._before_attempt()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt, delay)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                # e.g. KeyboardInterrupt: says nothing about upstream, but must end a trial call
+                self.breaker.record_neutral()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def acall(self, func, *args, **kwargs):
+        delay = self.base_delay
+        for attempt in range(1, self.max_attempts + 1):
+            self._before_attempt()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._on_error(e, attempt, delay)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancellation or interrupt: neutral, but must end a trial call
+                self.breaker.record_neutral()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.acall(func, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return wrapper
+
+    def stats(self):
+        return {
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failed_attempts": self.failed_attempts,
+            "short_circuited": self.short_circuited,
+            "circuit": self.breaker.state,
+        }
+
+
+_cohere_policy = None
+
+
+def cohere_retry_policy() -> RetryPolicy:
+    """The policy (and circuit breaker) shared by every Cohere call site."""
+    global _cohere_policy
+    if _cohere_policy is None:
+        _cohere_policy = RetryPolicy()
+    return _cohere_policy
+
+
+class RetryingChatCohere(ChatCohere):
+    """ChatCohere whose generations go through the shared retry policy.
+
+    `attempt_rate_limiter` is taken before every attempt, retries included.
+    BaseChatModel's own `rate_limiter` is taken only once per generation,
+    before any retry, so it is left unset.
+    """
+
+    attempt_rate_limiter: Optional[BaseRateLimiter] = Field(default=None, exclude=True)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def attempt():
+            if self.attempt_rate_limiter is not None:
+                self.attempt_rate_limiter.acquire()
+            return ChatCohere._generate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+        return cohere_retry_policy().call(attempt)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async def attempt():
+            if self.attempt_rate_limiter is not None:
+                await self.attempt_rate_limiter.aacquire()
+            return await ChatCohere._agenerate(self, messages, stop=stop, run_manager=run_manager, **kwargs)
+        return await cohere_retry_policy().acall(attempt)
+
+
+class RetryingEmbeddings(Embeddings):
+    """Embeddings wrapper whose upstream calls go through the shared retry policy.
+
+    With a rate limiter, every attempt (retries included) takes a slot from it.
+    """
+
+    def __init__(self, embeddings: Embeddings, rate_limiter: Optional[BaseRateLimiter] = None):
+        self.embeddings = embeddings
+        self.rate_limiter = rate_limiter
+
+    def _call(self, func, *args):
+        def attempt():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return func(*args)
+        return cohere_retry_policy().call(attempt)
+
+    async def _acall(self, func, *args):
+        async def attempt():
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire()
+            return await func(*args)
+        return await cohere_retry_policy().acall(attempt)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._call(self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self.embeddings.embed_query, text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._acall(self.embeddings.aembed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._acall(self.embeddings.aembed_query, text)
@@ -0,0 +1,87 @@
+"""Semantic response cache keyed on question embeddings.
+
+Questions are embedded and searched against previously answered ones in a
+FAISS inner-product index; a neighbour at or above the similarity threshold is
+a hit and its stored answer is returned without a generation call. The cache
+holds at most `max_entries` answers and evicts the least recently used one.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+from batch_scoring import normalize_rows
+from config import SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD
+
+
+class SemanticCache:
+    """Bounded nearest-neighbour cache from questions to answers."""
+
+    def __init__(self, embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.index = None
+        # id -> (question, answer), oldest use first
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray([self.embeddings.embed_query(question)], dtype=np.float32)
+        return normalize_rows(vector)
+
+    def lookup(self, question: str, vector: Optional[np.ndarray] = None) -> Optional[str]:
+        """Return the cached answer for a similar enough question, or None."""
+        if vector is None:
+            vector = self.embed(question)
+        with self._lock:
+            if self.entries:
+                scores, ids = self.index.search(vector, 1)
+                entry_id = int(ids[0][0])
+                if entry_id >= 0 and scores[0][0] >= self.threshold:
+                    self.hits += 1
+                    self.entries.move_to_end(entry_id)
+                    return self.entries[entry_id][1]
+            self.misses += 1
+            return None
+
+    def store(self, question: str, answer: str, vector: Optional[np.ndarray] = None):
+        """Cache `answer` for `question`, evicting the least recently used entry if full."""
+        if self.max_entries <= 0:
+            return
+        if vector is None:
+            vector = self.embed(question)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            while len(self.entries) >= self.max_entries:
+                evicted_id, _ = self.entries.popitem(last=False)
+                self.index.remove_ids(np.array([evicted_id], dtype=np.int64))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self.entries[entry_id] = (question, answer)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.index = None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
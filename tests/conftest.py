@@ -2,8 +2,52 @@
 
 import pytest
 import os
-from unittest.mock import patch, Mock
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, Mock, AsyncMock
+
+# config.py refuses to import without a key; mocked and replayed tests need none
+os.environ.setdefault('COHERE_API_KEY', 'test-key-for-testing')
+
 from assistant import Assistant
+from config import CASSETTE_MODE, CASSETTES_DIR
+
+# Values COHERE_API_KEY takes here when no real key was given
+PLACEHOLDER_API_KEYS = {"", "None", "test-key", "test-key-for-testing"}
+
+# Simulated cost of opening a new connection (DNS + TLS) to the stub
+STUB_CONNECT_DELAY = 0.3
+
+STUB_RESPONSES = {
+    "/v1/check-api-key": {"valid": True},
+    "/v1/chat": {"text": "This is a stub response.", "generation_id": "stub", "finish_reason": "COMPLETE"},
+    "/v1/summarize": {"id": "stub", "summary": "This is a stub summary."},
+}
+
+
+class StubCohereHandler(BaseHTTPRequestHandler):
+    """Minimal local stand-in for the Cohere HTTP API."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def setup(self):
+        time.sleep(STUB_CONNECT_DELAY)
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(STUB_RESPONSES.get(self.path, {})).encode()
+        self.send_response(200 if self.path in STUB_RESPONSES else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
 
 
 def pytest_configure(config):
@@ -11,6 +55,14 @@ def pytest_configure(config):
     # Set test environment variables
     os.environ['COHERE_API_KEY'] = str(os.getenv('COHERE_API_KEY'))
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Keep each phase's report on the test item, e.g. for cohere_cassette."""
+    outcome = yield
+    report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
     """Set up test environment."""
@@ -39,8 +91,63 @@ def mock_cohere_client():
         yield mock_instance
 
 
+@pytest.fixture
+def mock_async_cohere_client():
+    """Mock Cohere AsyncClient whose chat takes a moment, so it can be cancelled."""
+    with patch('cohere.AsyncClient') as mock_client:
+        mock_instance = Mock()
+        mock_client.return_value = mock_instance
+
+        async def chat(**kwargs):
+            await asyncio.sleep(0.05)
+            return Mock(text="This is an async test response.")
+
+        mock_instance.chat = AsyncMock(side_effect=chat)
+        mock_instance.summarize = AsyncMock(return_value=Mock(summary="This is an async test summary."))
+        mock_instance.check_api_key = AsyncMock(return_value={"valid": True})
+
+        yield mock_instance
+
+
 @pytest.fixture
 def ai_assistant(mock_cohere_client):
     """Create assistant instance with mocked client."""
     with patch.dict(os.environ, {'COHERE_API_KEY': 'test-key'}):
         return Assistant()
+
+
+@pytest.fixture
+def local_cohere_stub():
+    """Serve the stub Cohere API on localhost and yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCohereHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_connect_delay():
+    """Seconds the local Cohere stub takes to accept a new connection."""
+    return STUB_CONNECT_DELAY
+
+
+@pytest.fixture
+def cohere_cassette(request, monkeypatch):
+    """Record or replay the test's Cohere HTTP calls (see cassette.py)."""
+    from cassette import Cassette
+
+    # RAGAS usage analytics would go upstream on every evaluate()
+    monkeypatch.setenv("RAGAS_DO_NOT_TRACK", "true")
+    name = request.node.name if request.cls is None else f"{request.cls.__name__}.{request.node.name}"
+    cassette = Cassette(CASSETTES_DIR / request.module.__name__ / f"{name}.json.gz")
+    if CASSETTE_MODE == "once" and not cassette.replaying and \
+            os.getenv("COHERE_API_KEY", "") in PLACEHOLDER_API_KEYS:
+        pytest.skip(f"No cassette at {cassette.path} and no COHERE_API_KEY to record one")
+    with cassette.use():
+        yield cassette
+        # Keep a new recording only from a test that passed, so it is complete
+        report = getattr(request.node, "rep_call", None)
+        if report is None or not report.passed:
+            cassette.discard()
@@ -0,0 +1,95 @@
+"""Tests for the async, cancellable assistant calls used by the REPL."""
+
+import asyncio
+import pytest
+from unittest.mock import Mock
+from rate_limiter import RateLimiter
+
+
+class TestAsyncAssistant:
+    """Test cases for achat/asummarize and cancellation."""
+
+    def test_achat_updates_history(self, ai_assistant, mock_async_cohere_client):
+        """Test a completed async chat records both turns."""
+        response = asyncio.run(ai_assistant.achat("Hello"))
+
+        assert response == "This is an async test response."
+        assert ai_assistant.history == [
+            {"role": "USER", "message": "Hello"},
+            {"role": "CHATBOT", "message": response},
+        ]
+
+    def test_cancel_leaves_history_unchanged(self, ai_assistant, mock_async_cohere_client):
+        """Test cancelling an in-flight chat records nothing."""
+        async def run():
+            task = asyncio.create_task(ai_assistant.achat("Slow question"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert ai_assistant.history == []
+
+    def test_clear_during_request_is_respected(self, ai_assistant, mock_async_cohere_client):
+        """Test a reply arriving after /clear is not added to the new history."""
+        async def run():
+            task = asyncio.create_task(ai_assistant.achat("Question before clear"))
+            await asyncio.sleep(0.01)
+            ai_assistant.clear_history()
+            return await task
+
+        assert asyncio.run(run()) == "This is an async test response."
+        assert ai_assistant.history == []
+
+    def test_overlapping_chats_run_in_order(self, ai_assistant, mock_async_cohere_client):
+        """Test a second chat sent mid-flight sees the first exchange and history keeps send order."""
+        async def chat(message, chat_history, **kwargs):
+            # The first reply is the slower one
+            await asyncio.sleep(0.05 if message == "first" else 0.01)
+            return Mock(text=f"re: {message}")
+
+        mock_async_cohere_client.chat.side_effect = chat
+
+        async def run():
+            return await asyncio.gather(ai_assistant.achat("first"), ai_assistant.achat("second"))
+
+        assert asyncio.run(run()) == ["re: first", "re: second"]
+        second_history = mock_async_cohere_client.chat.call_args_list[1].kwargs["chat_history"]
+        assert second_history == [
+            {"role": "USER", "message": "first"},
+            {"role": "CHATBOT", "message": "re: first"},
+        ]
+        assert [turn["message"] for turn in ai_assistant.history] == [
+            "first", "re: first", "second", "re: second",
+        ]
+
+    def test_cancel_frees_rate_limit_slot(self, ai_assistant, mock_async_cohere_client):
+        """Test a request cancelled while waiting for its slot gives the slot back."""
+        ai_assistant.rate_limiter = RateLimiter(calls_per_minute=60)
+        ai_assistant.rate_limiter.acquire()  # the next slot is a second away
+
+        async def run():
+            task = asyncio.create_task(ai_assistant.achat("Queued question"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        before = ai_assistant.rate_limiter._next_slot
+        asyncio.run(run())
+
+        assert ai_assistant.rate_limiter._next_slot == before
+        mock_async_cohere_client.chat.assert_not_called()
+
+    def test_asummarize(self, ai_assistant, mock_async_cohere_client):
+        """Test async summarization."""
+        assert asyncio.run(ai_assistant.asummarize("Some text")) == "This is an async test summary."
+
+    def test_awarm_up(self, ai_assistant, mock_async_cohere_client):
+        """Test warm-up checks the API key and reports failures."""
+        assert asyncio.run(ai_assistant.awarm_up()) is True
+        mock_async_cohere_client.check_api_key.assert_awaited_once()
+
+        mock_async_cohere_client.check_api_key.side_effect = Exception("Network down")
+        assert asyncio.run(ai_assistant.awarm_up()) is False
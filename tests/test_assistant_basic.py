@@ -95,3 +95,4 @@ class TestSimpleAssistant:
 
         response = ai_assistant.summarize("Test text")
         assert response.startswith("Error:")
+
@@ -0,0 +1,133 @@
+"""Tests for JSONL batch mode."""
+
+import asyncio
+import io
+import json
+import os
+import tempfile
+from unittest.mock import AsyncMock, Mock
+import batch
+
+
+def jobs(*lines):
+    return [json.dumps(line) + "\n" for line in lines]
+
+
+class TestBatchMode:
+    """Test cases for batch.run_batch and resuming."""
+
+    def test_results_written_in_input_order(self, ai_assistant, mock_async_cohere_client):
+        """Test ordered mode writes results in input order even when later jobs finish first."""
+        async def chat(message, **kwargs):
+            await asyncio.sleep(0.05 if message == "slow" else 0.0)
+            return Mock(text=f"reply to {message}")
+
+        mock_async_cohere_client.chat = AsyncMock(side_effect=chat)
+        out = io.StringIO()
+
+        stats = asyncio.run(batch.run_batch(
+            ai_assistant,
+            jobs({"id": "a", "prompt": "slow"}, {"id": "b", "prompt": "fast"}, {"id": "c", "summarize": "text"}),
+            out,
+            concurrency=3,
+        ))
+
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["id"] for r in results] == ["a", "b", "c"]
+        assert results[0]["response"] == "reply to slow"
+        assert results[2]["summary"] == "This is an async test summary."
+        assert stats.report()["completed"] == 3
+
+    def test_unordered_writes_as_finished(self, ai_assistant, mock_async_cohere_client):
+        """Test unordered mode tags results with ids and writes them as they finish."""
+        async def chat(message, **kwargs):
+            await asyncio.sleep(0.05 if message == "slow" else 0.0)
+            return Mock(text=message)
+
+        mock_async_cohere_client.chat = AsyncMock(side_effect=chat)
+        out = io.StringIO()
+
+        asyncio.run(batch.run_batch(ai_assistant, jobs({"prompt": "slow"}, {"prompt": "fast"}), out,
+                                    concurrency=2, ordered=False))
+
+        assert [json.loads(line)["id"] for line in out.getvalue().splitlines()] == [1, 0]
+
+    def test_errors_are_recorded_and_retried_on_resume(self, ai_assistant, mock_async_cohere_client):
+        """Test failed jobs are reported and rerun, finished jobs are skipped on resume."""
+        input_lines = jobs({"id": "ok", "prompt": "hello"}, {"id": "bad", "prompt": "fails"})
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.jsonl') as tmp_file:
+            tmp_filename = tmp_file.name
+
+        try:
+            mock_async_cohere_client.chat = AsyncMock(side_effect=[Mock(text="hi"), Exception("API Error")])
+            with open(tmp_filename, 'a') as out:
+                stats = asyncio.run(batch.run_batch(ai_assistant, input_lines, out, concurrency=1))
+            assert stats.errors == 1
+            assert batch.completed_ids(tmp_filename) == {"ok"}
+
+            mock_async_cohere_client.chat = AsyncMock(return_value=Mock(text="recovered"))
+            with open(tmp_filename, 'a') as out:
+                stats = asyncio.run(batch.run_batch(ai_assistant, input_lines, out,
+                                                    skip_ids=batch.completed_ids(tmp_filename)))
+            assert stats.skipped == 1
+            assert mock_async_cohere_client.chat.call_count == 1
+            assert batch.completed_ids(tmp_filename) == {"ok", "bad"}
+        finally:
+            os.unlink(tmp_filename)
+
+    def test_resume_after_partial_last_line(self, ai_assistant, mock_async_cohere_client):
+        """Test a result cut off mid-write is dropped and its job rerun, not glued to the next."""
+        input_lines = jobs({"id": "a", "prompt": "first"}, {"id": "b", "prompt": "second"})
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.jsonl') as tmp_file:
+            tmp_file.write(json.dumps({"id": "a", "response": "hi", "latency_s": 0.1}) + "\n")
+            tmp_file.write('{"id": "b", "respo')
+            tmp_filename = tmp_file.name
+
+        try:
+            for _ in range(2):
+                with batch.open_results(tmp_filename) as out:
+                    asyncio.run(batch.run_batch(ai_assistant, input_lines, out,
+                                                skip_ids=batch.completed_ids(tmp_filename)))
+
+            with open(tmp_filename) as f:
+                results = [json.loads(line) for line in f]
+            assert [r["id"] for r in results] == ["a", "b"]
+            assert mock_async_cohere_client.chat.call_count == 1
+        finally:
+            os.unlink(tmp_filename)
+
+    def test_malformed_lines_do_not_abort_the_run(self, ai_assistant, mock_async_cohere_client):
+        """Test a bad line gets an error result in order and the other jobs still finish."""
+        lines = (jobs({"id": "a", "prompt": "first"}) + ["{not json\n", "[1, 2]\n"]
+                 + jobs({"id": "d", "prompt": "last"}))
+        out = io.StringIO()
+
+        stats = asyncio.run(batch.run_batch(ai_assistant, lines, out, concurrency=2))
+
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["id"] for r in results] == ["a", 1, 2, "d"]
+        assert "response" in results[0] and "response" in results[3]
+        assert results[1]["error"].startswith("Invalid job")
+        assert results[2]["error"] == "Invalid job: job must be a JSON object"
+        assert stats.report()["errors"] == 2
+
+    def test_concurrency_is_bounded(self, ai_assistant, mock_async_cohere_client):
+        """Test no more than `concurrency` jobs are in flight at once."""
+        in_flight = 0
+        peak = 0
+
+        async def chat(message, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(text=message)
+
+        mock_async_cohere_client.chat = AsyncMock(side_effect=chat)
+        lines = jobs(*({"prompt": f"job {i}"} for i in range(20)))
+
+        stats = asyncio.run(batch.run_batch(ai_assistant, lines, io.StringIO(), concurrency=4))
+
+        assert peak == 4
+        assert stats.report()["completed"] == 20
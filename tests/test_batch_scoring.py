@@ -0,0 +1,69 @@
+"""Tests for vectorized batch scoring of embedding-based metrics."""
+
+import numpy as np
+import pytest
+from batch_scoring import batch_answer_similarity, batch_question_similarity, embed_in_batches
+
+
+class FakeEmbeddings:
+    """Deterministic embeddings that record every upstream batch."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.batches = []
+
+    def vector(self, text):
+        rng = np.random.default_rng(sum(map(ord, text)))
+        return rng.normal(size=self.dim)
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [self.vector(text).tolist() for text in texts]
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+class TestBatchScoring:
+    """Test cases for bulk embedding and vectorized cosine scores."""
+
+    def test_embed_in_batches_deduplicates(self):
+        """Test each distinct text is embedded once, in batches of batch_size."""
+        embeddings = FakeEmbeddings()
+        texts = ["a", "b", "a", "c", "b"]
+
+        matrix = embed_in_batches(embeddings, texts, batch_size=2)
+
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (5, 8)
+        assert embeddings.batches == [["a", "b"], ["c"]]
+        np.testing.assert_array_equal(matrix[0], matrix[2])
+
+    def test_answer_similarity_matches_per_row(self):
+        """Test batch scores equal the per-row cosine of answer and reference."""
+        embeddings = FakeEmbeddings()
+        answers = ["Paris is the capital.", "ML learns from data.", "Python is a language."]
+        references = ["Paris is France's capital.", "ML is a type of AI.", "Python is a language."]
+
+        scores = batch_answer_similarity(answers, references, embeddings)
+
+        expected = [cosine(embeddings.vector(a), embeddings.vector(r)) for a, r in zip(answers, references)]
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+        assert scores[2] == pytest.approx(1.0)
+        np.testing.assert_array_equal(
+            batch_answer_similarity(answers, references, embeddings, threshold=0.99), [0.0, 0.0, 1.0]
+        )
+
+    def test_question_similarity_averages_generated_questions(self):
+        """Test the answer_relevancy half averages cosines per row."""
+        embeddings = FakeEmbeddings()
+        questions = ["What is AI?", "What is ML?", "What is NLP?"]
+        generated = [["Define AI", "Explain AI"], [], ["What is NLP?"]]
+
+        scores = batch_question_similarity(questions, generated, embeddings)
+
+        first = np.mean([cosine(embeddings.vector("What is AI?"), embeddings.vector(q)) for q in generated[0]])
+        assert scores[0] == pytest.approx(first, rel=1e-5)
+        assert np.isnan(scores[1])
+        assert scores[2] == pytest.approx(1.0)
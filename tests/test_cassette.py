@@ -0,0 +1,97 @@
+"""Tests for recording and replaying Cohere HTTP traffic."""
+
+import asyncio
+import pytest
+import httpx
+from cassette import Cassette, CassetteError, CassetteMiss, request_key
+
+
+class TestCassette:
+    """Test cases for Cassette."""
+
+    def test_record_then_replay_offline(self, local_cohere_stub, tmp_path):
+        """Test recorded responses are replayed without contacting the server."""
+        path = tmp_path / "chat.json.gz"
+        body = {"message": "What is AI?", "model": "command-r"}
+
+        with Cassette(path, mode="once").use() as cassette:
+            recorded = httpx.post(f"{local_cohere_stub}/v1/chat", json=body).json()
+        assert cassette.mode == "record" and cassette.recorded == 1
+        assert path.exists()
+
+        # Nothing listens here, so only the cassette can answer
+        with Cassette(path, mode="once").use() as cassette:
+            replayed = httpx.post("http://127.0.0.1:9/v1/chat", json=body,
+                                  headers={"Authorization": "Bearer other-key"}).json()
+        assert cassette.replaying and cassette.played == 1
+        assert replayed == recorded
+
+    def test_async_clients_are_replayed(self, local_cohere_stub, tmp_path):
+        """Test the async transport used by the async Cohere client is covered too."""
+        path = tmp_path / "embed.json.gz"
+
+        async def embed(base_url):
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                response = await client.post("/v1/chat", json={"texts": ["a", "b"]})
+                return response.json()
+
+        with Cassette(path, mode="record").use():
+            recorded = asyncio.run(embed(local_cohere_stub))
+        with Cassette(path, mode="replay").use():
+            assert asyncio.run(embed("http://127.0.0.1:9")) == recorded
+
+    def test_unrecorded_request_raises(self, tmp_path):
+        """Test replay mode never goes upstream and still fails after errors were swallowed."""
+        path = tmp_path / "empty.json.gz"
+        Cassette(path, mode="record").save()
+
+        with pytest.raises(CassetteMiss, match="1 requests had no recorded response"):
+            with Cassette(path, mode="replay").use():
+                with pytest.raises(CassetteMiss):
+                    httpx.post("http://127.0.0.1:9/v1/chat", json={"message": "unrecorded"})
+
+    def test_error_responses_are_not_saved(self, local_cohere_stub, tmp_path):
+        """Test a recording with a request that never got a 2xx is refused."""
+        path = tmp_path / "unauthorized.json.gz"
+
+        with pytest.raises(CassetteError, match="never got a 2xx response"):
+            with Cassette(path, mode="once").use():
+                assert httpx.post(f"{local_cohere_stub}/v1/unknown", json={}).status_code == 404
+                httpx.post(f"{local_cohere_stub}/v1/chat", json={"message": "ok"})
+        assert not path.exists()
+
+    def test_partial_recordings_are_not_saved(self, local_cohere_stub, tmp_path):
+        """Test a block that raises, or a discarded cassette, leaves nothing to replay."""
+        path = tmp_path / "partial.json.gz"
+
+        with pytest.raises(RuntimeError):
+            with Cassette(path, mode="once").use():
+                httpx.post(f"{local_cohere_stub}/v1/chat", json={"message": "first"})
+                raise RuntimeError("test failed halfway")
+        assert not path.exists()
+
+        with Cassette(path, mode="once").use() as cassette:
+            httpx.post(f"{local_cohere_stub}/v1/chat", json={"message": "first"})
+            cassette.discard()
+        assert not path.exists()
+
+    def test_repeated_requests_replay_in_order(self, tmp_path):
+        """Test identical requests get their recorded responses in order, then the last one."""
+        cassette = Cassette(tmp_path / "samples.json.gz", mode="record")
+        key = request_key("POST", "/v1/chat", b'{"message": "q"}')
+        cassette.interactions[key] = [
+            {"status": 200, "content_type": "application/json", "json": {"text": text}}
+            for text in ("first", "second")
+        ]
+        cassette.save()
+
+        with Cassette(cassette.path, mode="replay").use():
+            texts = [httpx.post("http://127.0.0.1:9/v1/chat", json={"message": "q"}).json()["text"]
+                     for _ in range(3)]
+        assert texts == ["first", "second", "second"]
+
+    def test_key_ignores_json_formatting(self):
+        """Test request matching ignores JSON key order and whitespace."""
+        assert request_key("POST", "/v1/embed", b'{"a": 1, "b": [2, 3]}') == \
+            request_key("POST", "/v1/embed", b'{"b":[2,3],"a":1}')
+        assert request_key("POST", "/v1/embed", b'{"a": 1}') != request_key("POST", "/v1/chat", b'{"a": 1}')
@@ -0,0 +1,66 @@
+"""Tests for sharing intermediate LLM results between metrics."""
+
+import asyncio
+from unittest.mock import Mock, patch
+from ragas.llms import LangchainLLMWrapper
+from eval_memo import EvaluationMemo, MemoizedLLMWrapper
+
+
+def make_prompt(text):
+    prompt = Mock()
+    prompt.to_string.return_value = text
+    return prompt
+
+
+class TestEvaluationMemo:
+    """Test cases for MemoizedLLMWrapper."""
+
+    def test_repeated_prompt_is_sent_once(self):
+        """Test identical prompts from different metrics share one upstream call."""
+        memo = EvaluationMemo()
+        llm = MemoizedLLMWrapper(Mock(), memo)
+
+        with patch.object(LangchainLLMWrapper, 'generate_text', return_value="statements") as upstream:
+            first = llm.generate_text(make_prompt("Extract statements: Paris is the capital."))
+            second = llm.generate_text(make_prompt("Extract statements: Paris is the capital."))
+            llm.generate_text(make_prompt("Extract statements: Python is a language."))
+
+        assert first == second == "statements"
+        assert upstream.call_count == 2
+        assert memo.stats() == {"requested": 3, "upstream": 2, "saved": 1, "saved_ratio": 1 / 3}
+        assert "1 shared between metrics" in memo.report()
+
+    def test_concurrent_requests_wait_for_first(self):
+        """Test concurrent identical async prompts wait for the request in flight."""
+        memo = EvaluationMemo()
+        llm = MemoizedLLMWrapper(Mock(), memo)
+        calls = []
+
+        async def slow_generate(self, prompt, n=1, temperature=None, stop=None, callbacks=None):
+            calls.append(prompt.to_string())
+            await asyncio.sleep(0.05)
+            return "verdicts"
+
+        async def run():
+            prompts = [make_prompt("Verify context 1") for _ in range(3)]
+            return await asyncio.gather(*(llm.agenerate_text(p) for p in prompts))
+
+        with patch.object(LangchainLLMWrapper, 'agenerate_text', slow_generate):
+            results = asyncio.run(run())
+
+        assert results == ["verdicts"] * 3
+        assert len(calls) == 1
+        assert memo.saved == 2
+
+    def test_sampling_settings_are_part_of_key(self):
+        """Test prompts with different n or temperature are not shared."""
+        memo = EvaluationMemo()
+        llm = MemoizedLLMWrapper(Mock(), memo)
+
+        with patch.object(LangchainLLMWrapper, 'generate_text', return_value="questions") as upstream:
+            llm.generate_text(make_prompt("Generate question"), n=1)
+            llm.generate_text(make_prompt("Generate question"), n=3)
+            llm.generate_text(make_prompt("Generate question"), n=3, temperature=0.3)
+
+        assert upstream.call_count == 3
+        assert memo.saved == 0
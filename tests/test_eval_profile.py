@@ -0,0 +1,127 @@
+"""Tests for the per-metric evaluation profiler."""
+
+import asyncio
+import json
+import uuid
+from unittest.mock import AsyncMock, Mock, patch
+from eval_profile import EvaluationProfiler, UNATTRIBUTED, prompt_label
+from retry import cohere_retry_policy
+
+
+class ApiError(Exception):
+    status_code = 503
+
+
+def llm_response(input_tokens, output_tokens):
+    message = Mock(usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens})
+    return Mock(generations=[[Mock(message=message)]])
+
+
+class FakeMetric:
+    """Metric whose scoring makes one LLM call and one embeddings call per row."""
+
+    def __init__(self, name, profiler, embeddings, rate_limiter, prompt):
+        self.name = name
+        self.profiler = profiler
+        self.embeddings = embeddings
+        self.rate_limiter = rate_limiter
+        self.prompt = prompt
+
+    async def _ascore(self, row, callbacks=None):
+        await self.rate_limiter.aacquire()
+        run_id = uuid.uuid4()
+        handler = self.profiler.callback_handler
+        handler.on_chat_model_start({}, [[Mock(content=self.prompt)]], run_id=run_id)
+        handler.on_llm_end(llm_response(100, 20), run_id=run_id)
+        await self.embeddings.aembed_query(row)
+        return 1.0
+
+
+def make_metrics(profiler):
+    embeddings = profiler.wrap_embeddings(Mock(aembed_query=AsyncMock(return_value=[0.1])))
+    rate_limiter = profiler.wrap_rate_limiter(Mock(aacquire=AsyncMock(return_value=True)))
+    return [
+        FakeMetric("faithfulness", profiler, embeddings, rate_limiter, "Extract statements\nfrom the answer"),
+        FakeMetric("answer_relevancy", profiler, embeddings, rate_limiter, "Generate a question\nfor the answer"),
+    ]
+
+
+class TestEvaluationProfiler:
+    """Test cases for EvaluationProfiler."""
+
+    def test_calls_are_attributed_to_metrics(self):
+        """Test calls, tokens and rows are recorded under the metric that made them."""
+        profiler = EvaluationProfiler()
+        metrics = make_metrics(profiler)
+
+        async def run():
+            rows = ["row 1", "row 2", "row 3"]
+            await asyncio.gather(*(metric._ascore(row) for metric in metrics for row in rows))
+
+        with profiler.profile(metrics):
+            asyncio.run(run())
+
+        report = profiler.report()
+        faithfulness = report["metrics"]["faithfulness"]
+        assert faithfulness["rows"] == 3
+        assert faithfulness["calls"] == 6
+        assert faithfulness["input_tokens"] == 300
+        assert faithfulness["output_tokens"] == 60
+        assert set(faithfulness["prompts"]) == {"Extract statements", "embeddings"}
+        assert faithfulness["prompts"]["Extract statements"]["calls"] == 3
+        assert report["total"]["calls"] == 12
+        assert UNATTRIBUTED not in report["metrics"]
+        json.dumps(report)
+
+    def test_metrics_are_restored(self):
+        """Test scoring methods are unpatched when profiling ends."""
+        profiler = EvaluationProfiler()
+        metrics = make_metrics(profiler)
+        original = metrics[0]._ascore
+
+        with profiler.profile(metrics):
+            assert metrics[0]._ascore != original
+        assert metrics[0]._ascore == original
+        assert profiler._on_retry not in cohere_retry_policy().on_retry
+
+    def test_retries_and_failures(self):
+        """Test retries of the shared policy and failed calls are counted per metric."""
+        profiler = EvaluationProfiler()
+        upstream = AsyncMock(side_effect=[ApiError(), [0.1]])
+        embeddings = profiler.wrap_embeddings(Mock(aembed_query=AsyncMock(side_effect=ApiError())))
+        policy = cohere_retry_policy()
+
+        class RetriedMetric:
+            name = "context_recall"
+
+            async def _ascore(self, row, callbacks=None):
+                await policy.acall(upstream)
+                try:
+                    await embeddings.aembed_query(row)
+                except ApiError:
+                    pass
+
+        metric = RetriedMetric()
+        with patch.object(policy, "next_delay", return_value=0.0), profiler.profile([metric]):
+            asyncio.run(metric._ascore("row"))
+
+        entry = profiler.report()["metrics"]["context_recall"]
+        assert entry["retries"] == 1
+        assert entry["failed"] == 1
+
+    def test_flame_and_folded_output(self):
+        """Test the text flame graph and collapsed stacks list every metric and prompt."""
+        profiler = EvaluationProfiler()
+        profiler.record("faithfulness", "Extract statements; then verify", calls=2, wall_s=3.0)
+        profiler.record("faithfulness", None, queue_s=1.0, retries=1)
+        profiler.record("answer_relevancy", "embeddings", calls=1, wall_s=1.0)
+
+        flame = profiler.flame().splitlines()
+        assert flame[0].startswith("faithfulness")
+        assert "queued 1.00s retries 1" in flame[0]
+        assert flame[1].startswith("  Extract statements")
+        assert profiler.folded().splitlines() == [
+            "answer_relevancy;embeddings 1000",
+            "faithfulness;Extract statements, then verify 3000",
+        ]
+        assert prompt_label("\n\n  Given a question  \nmore") == "Given a question"
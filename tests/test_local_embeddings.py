@@ -0,0 +1,39 @@
+"""Tests for the offline local embeddings backend."""
+
+import numpy as np
+from local_embeddings import LocalHashingEmbeddings
+
+
+class TestLocalEmbeddings:
+    """Test cases for LocalHashingEmbeddings."""
+
+    def test_vectors_are_normalized_and_deterministic(self):
+        """Test same text gives the same unit-length vector across instances."""
+        first = LocalHashingEmbeddings(dim=64).embed_query("What is machine learning?")
+        second = LocalHashingEmbeddings(dim=64).embed_query("What is machine learning?")
+
+        assert len(first) == 64
+        assert abs(np.linalg.norm(first) - 1.0) < 1e-5
+        assert first == second
+
+    def test_related_texts_score_higher(self):
+        """Test paraphrases are closer than unrelated texts."""
+        embeddings = LocalHashingEmbeddings()
+        vectors = embeddings.embed_array([
+            "Machine learning lets computers learn from data.",
+            "Machine learning allows computers to learn from data without explicit programming.",
+            "Paris is the capital and largest city of France.",
+        ])
+
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+    def test_threaded_batches_match_single_batch(self):
+        """Test splitting work across threads does not change the vectors."""
+        texts = [f"Test document number {i}" for i in range(50)]
+
+        single = LocalHashingEmbeddings(batch_size=100).embed_array(texts)
+        threaded = LocalHashingEmbeddings(batch_size=7, max_workers=4).embed_array(texts)
+
+        assert single.dtype == np.float32
+        np.testing.assert_allclose(single, threaded, rtol=1e-6)
+        assert threaded.shape == (50, 384)
@@ -8,6 +8,13 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from assistant import Assistant
 import os
+import statistics
+import numpy as np
+from batch_scoring import batch_answer_similarity, normalize_rows
+from local_embeddings import LocalHashingEmbeddings
+from retrieval import Retriever
+from retry import CircuitBreaker, RetryPolicy
+from turns import TurnStore
 
 class TestPerformance:
     """Performance tests for the assistant."""
@@ -68,4 +75,152 @@ class TestPerformance:
         assert all(isinstance(result, str) for result in results)
         assert total_time < 30  # Should complete within 30 seconds
 
-        print(f"Concurrent requests completed in: {total_time:.2f} seconds")
\ No newline at end of file
+        print(f"Concurrent requests completed in: {total_time:.2f} seconds")
+
+    def test_batch_similarity_scoring_speed(self):
+        """Test batch_answer_similarity over 100k rows of precomputed embeddings."""
+        rows, dim = 100_000, 256
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((2 * rows, dim), dtype=np.float32)
+        answers = [f"answer {i}" for i in range(rows)]
+        references = [f"reference {i}" for i in range(rows)]
+        lookup = {text: i for i, text in enumerate(answers + references)}
+
+        class PrecomputedEmbeddings:
+            def embed_documents(self, texts):
+                return vectors[[lookup[text] for text in texts]]
+
+        start_time = time.time()
+        scores = batch_answer_similarity(answers, references, PrecomputedEmbeddings())
+        scoring_time = time.time() - start_time
+
+        assert scores.shape == (rows,)
+        assert np.all(np.abs(scores) <= 1.0 + 1e-5)
+        assert scoring_time < 5.0
+        print(f"Scored {rows} rows in {scoring_time:.3f} seconds")
+
+    def test_local_embeddings_throughput(self):
+        """Test offline embeddings run at thousands of rows per second."""
+        embeddings = LocalHashingEmbeddings()
+        texts = [f"Machine learning answer number {i} about neural networks and data." for i in range(5000)]
+        embeddings.embed_array(texts[:10])  # warm up
+
+        start_time = time.time()
+        vectors = embeddings.embed_array(texts)
+        elapsed = time.time() - start_time
+
+        rows_per_second = len(texts) / elapsed
+        assert vectors.shape == (len(texts), embeddings.dim)
+        assert rows_per_second > 1000
+        print(f"Local embeddings: {rows_per_second:.0f} rows/second")
+
+    def test_retrieval_index_latency(self):
+        """Benchmark index build and top-k query latency.
+
+        Set RETRIEVAL_BENCH_CHUNKS=1000000 for the full-size run.
+        """
+        chunks = int(os.getenv("RETRIEVAL_BENCH_CHUNKS", "100000"))
+        dim = 384
+        rng = np.random.default_rng(0)
+        vectors = normalize_rows(rng.standard_normal((chunks, dim), dtype=np.float32))
+        queries = normalize_rows(rng.standard_normal((100, dim), dtype=np.float32))
+        retriever = Retriever(embeddings=None)
+
+        start_time = time.time()
+        batch = 100_000
+        for start in range(0, chunks, batch):
+            end = min(start + batch, chunks)
+            retriever.add([f"chunk {i}" for i in range(start, end)], vectors[start:end])
+        build_time = time.time() - start_time
+
+        latencies = []
+        for query in queries:
+            query_start = time.time()
+            results = retriever.search_vectors(query[None, :], k=3)
+            latencies.append(time.time() - query_start)
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        assert len(retriever) == chunks
+        assert len(results[0]) == 3
+        print(f"Indexed {chunks} chunks in {build_time:.2f}s; "
+              f"query p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms")
+
+    def test_first_response_latency_with_warm_up(self, local_cohere_stub, stub_connect_delay):
+        """Test a first achat after awarm_up, as the REPL does, is as fast as steady-state chats."""
+        async def timed_chat(assistant, message):
+            start_time = time.time()
+            await assistant.achat(message)
+            return time.time() - start_time
+
+        async def run():
+            cold = Assistant(api_key='test-key', base_url=local_cohere_stub)
+            cold_first = await timed_chat(cold, "Hello")
+
+            warm = Assistant(api_key='test-key', base_url=local_cohere_stub)
+            assert await warm.awarm_up()  # runs while the REPL waits for input
+            latencies = [await timed_chat(warm, f"Message {i}") for i in range(6)]
+            return cold_first, latencies
+
+        cold_first, latencies = asyncio.run(run())
+        warm_first, steady = latencies[0], statistics.median(latencies[1:])
+        assert cold_first > stub_connect_delay
+        assert warm_first < steady + stub_connect_delay / 2
+        print(f"First response: cold {cold_first * 1000:.0f}ms, warm {warm_first * 1000:.0f}ms, "
+              f"steady state {steady * 1000:.0f}ms")
+
+    def test_circuit_breaker_under_outage(self):
+        """Compare failure latency and wasted calls during an outage with and without the breaker."""
+        class Unavailable(Exception):
+            status_code = 503
+
+        def run(policy, requests=20):
+            upstream_calls = []
+
+            def call():
+                upstream_calls.append(1)
+                raise Unavailable()
+
+            start_time = time.time()
+            for _ in range(requests):
+                try:
+                    policy.call(call)
+                except Exception:
+                    pass
+            return len(upstream_calls), (time.time() - start_time) / requests
+
+        no_breaker = RetryPolicy(max_attempts=3, base_delay=0.005, max_delay=0.02,
+                                 breaker=CircuitBreaker(failure_threshold=10 ** 9))
+        with_breaker = RetryPolicy(max_attempts=3, base_delay=0.005, max_delay=0.02,
+                                   breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+        calls_without, latency_without = run(no_breaker)
+        calls_with, latency_with = run(with_breaker)
+
+        assert calls_with < calls_without
+        assert latency_with < latency_without
+        print(f"Outage: {calls_without} upstream calls, {latency_without * 1000:.1f}ms per failure without breaker; "
+              f"{calls_with} calls, {latency_with * 1000:.1f}ms with breaker")
+
+    def test_history_bytes_per_turn(self):
+        """Compare memory per history turn for a list of dicts and a TurnStore."""
+        import importlib.util
+        import sys
+        turns = [{"role": "USER" if i % 2 == 0 else "CHATBOT", "message": f"Turn {i}: " + "lorem ipsum " * 40}
+                 for i in range(2000)]
+
+        # Role strings are shared by every dict, so count each distinct one once
+        roles = {id(turn["role"]): turn["role"] for turn in turns}
+        list_bytes = (sys.getsizeof(turns) + sum(sys.getsizeof(role) for role in roles.values())
+                      + sum(sys.getsizeof(turn) + sys.getsizeof(turn["message"]) for turn in turns))
+        store = TurnStore(turns, compress_cold=False)
+
+        assert store.nbytes() < list_bytes
+        assert store == turns
+        report = (f"History bytes per turn: list of dicts {list_bytes / len(turns):.0f}, "
+                  f"TurnStore {store.nbytes() / len(turns):.0f}")
+        if importlib.util.find_spec("zstandard"):
+            compressed = TurnStore(turns, compress_cold=True)
+            report += f", compressed {compressed.nbytes() / len(turns):.0f}"
+        print(report)
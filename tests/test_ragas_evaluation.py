@@ -1,5 +1,6 @@
 import pytest
 import time
+import numpy as np
 from typing import List, Dict, Any
 from datasets import Dataset
 from ragas import evaluate
@@ -13,19 +14,31 @@ from ragas.metrics import (
 )
 
 # Import configuration from your existing config file
-from config import get_ragas_config, TEST_CONFIG, handle_rate_limit_error
+from config import get_ragas_config, TEST_CONFIG, LOGS_DIR, handle_rate_limit_error
+from eval_memo import EvaluationMemo
+from eval_profile import EvaluationProfiler
+from batch_scoring import batch_answer_similarity
 
 
 class TestRAGASEvaluation:
     """Test RAGAS evaluation metrics with Cohere models."""
 
     @pytest.fixture(autouse=True)
-    def setup(self):
+    def setup(self, cohere_cassette):
         """Set up Cohere models for all tests."""
+        # Cohere calls are replayed from tests/cassettes once recorded
+        self.cassette = cohere_cassette
         # Get configuration from centralized config file
         ragas_config = get_ragas_config()
         self.ragas_llm = ragas_config["llm"]
         self.ragas_embeddings = ragas_config["embeddings"]
+        # Retries are left to retry.py instead of ragas
+        self.run_config = ragas_config["run_config"]
+
+    def pause(self, seconds):
+        """Wait between tests to avoid rate limits, unless replaying a cassette."""
+        if not self.cassette.replaying:
+            time.sleep(seconds)
 
     @pytest.fixture
     def sample_dataset(self) -> Dataset:
@@ -66,7 +79,8 @@ class TestRAGASEvaluation:
             metrics=[answer_relevancy],
             llm=self.ragas_llm,
             embeddings=self.ragas_embeddings,
-            raise_exceptions=TEST_CONFIG["raise_exceptions"]
+            raise_exceptions=TEST_CONFIG["raise_exceptions"],
+            run_config=self.run_config
         )
 
         # Access results correctly using to_pandas()
@@ -85,7 +99,7 @@ class TestRAGASEvaluation:
     def test_faithfulness(self, sample_dataset):
         """Test faithfulness metric."""
         # Add delay to avoid rate limits
-        time.sleep(TEST_CONFIG["delay_between_tests"])
+        self.pause(TEST_CONFIG["delay_between_tests"])
 
         # Configure metric with Cohere
         faithfulness.llm = self.ragas_llm
@@ -94,7 +108,8 @@ class TestRAGASEvaluation:
             sample_dataset,
             metrics=[faithfulness],
             llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings
+            embeddings=self.ragas_embeddings,
+            run_config=self.run_config
         )
 
         # Access results correctly
@@ -116,7 +131,7 @@ class TestRAGASEvaluation:
     def test_answer_correctness(self, sample_dataset):
         """Test answer correctness metric."""
         # Add delay to avoid rate limits
-        time.sleep(2)
+        self.pause(2)
 
         # Configure metric with Cohere
         answer_correctness.llm = self.ragas_llm
@@ -126,7 +141,8 @@ class TestRAGASEvaluation:
             sample_dataset,
             metrics=[answer_correctness],
             llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings
+            embeddings=self.ragas_embeddings,
+            run_config=self.run_config
         )
 
         df = result.to_pandas()
@@ -146,7 +162,7 @@ class TestRAGASEvaluation:
     def test_answer_similarity(self, sample_dataset):
         """Test answer similarity metric."""
         # Add delay to avoid rate limits
-        time.sleep(2)
+        self.pause(2)
 
         # Configure metric with Cohere
         answer_similarity.llm = self.ragas_llm
@@ -156,7 +172,8 @@ class TestRAGASEvaluation:
             sample_dataset,
             metrics=[answer_similarity],
             llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings
+            embeddings=self.ragas_embeddings,
+            run_config=self.run_config
         )
 
         df = result.to_pandas()
@@ -176,7 +193,7 @@ class TestRAGASEvaluation:
     def test_context_recall(self, sample_dataset):
         """Test context recall metric."""
         # Add delay to avoid rate limits
-        time.sleep(2)
+        self.pause(2)
 
         # Configure metric with Cohere
         context_recall.llm = self.ragas_llm
@@ -185,7 +202,8 @@ class TestRAGASEvaluation:
             sample_dataset,
             metrics=[context_recall],
             llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings
+            embeddings=self.ragas_embeddings,
+            run_config=self.run_config
         )
 
         df = result.to_pandas()
@@ -205,7 +223,7 @@ class TestRAGASEvaluation:
     def test_context_precision(self, sample_dataset):
         """Test context precision metric."""
         # Add delay to avoid rate limits
-        time.sleep(2)
+        self.pause(2)
 
         # Configure metric with Cohere
         context_precision.llm = self.ragas_llm
@@ -214,7 +232,8 @@ class TestRAGASEvaluation:
             sample_dataset,
             metrics=[context_precision],
             llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings
+            embeddings=self.ragas_embeddings,
+            run_config=self.run_config
         )
 
         df = result.to_pandas()
@@ -234,34 +253,54 @@ class TestRAGASEvaluation:
     def test_comprehensive_evaluation(self, sample_dataset):
         """Test multiple metrics together."""
         # Add delay to avoid rate limits
-        time.sleep(2)
+        self.pause(2)
 
         metrics = [
             answer_relevancy,
             faithfulness,
+            answer_correctness,
             context_recall,
             context_precision
         ]
 
+        # Share intermediate LLM results between metrics: faithfulness and
+        # answer_correctness extract statements from each answer with the same prompt
+        memo = EvaluationMemo()
+        # Record which metric and prompt the upstream calls, tokens and time go to
+        profiler = EvaluationProfiler()
+        ragas_config = get_ragas_config(memo=memo, profiler=profiler)
+        shared_llm = ragas_config["llm"]
+        profiled_embeddings = ragas_config["embeddings"]
+
         # Configure all metrics with Cohere
         for metric in metrics:
-            metric.llm = self.ragas_llm
+            metric.llm = shared_llm
             if hasattr(metric, 'embeddings'):
-                metric.embeddings = self.ragas_embeddings
-
-        result = evaluate(
-            sample_dataset,
-            metrics=metrics,
-            llm=self.ragas_llm,
-            embeddings=self.ragas_embeddings,
-            raise_exceptions=False  # Don't raise exceptions for individual failures
-        )
+                metric.embeddings = profiled_embeddings
+
+        with profiler.profile(metrics):
+            result = evaluate(
+                sample_dataset,
+                metrics=metrics,
+                llm=shared_llm,
+                embeddings=profiled_embeddings,
+                raise_exceptions=False,  # Don't raise exceptions for individual failures
+                run_config=ragas_config["run_config"]
+            )
 
         print("\n=== RAGAS Evaluation Results ===")
+        print(memo.report())
+        # Evaluated one metric at a time, every requested call would go upstream
+        print(f"One metric at a time: {memo.requested} LLM calls, together: {memo.upstream}")
+        print("\n=== Evaluation Profile ===")
+        print(profiler.flame())
+        profiler.save(LOGS_DIR / "ragas_profile.json")
+        assert memo.saved > 0
         df = result.to_pandas()
 
         # Process results for each metric
-        for metric_name in ['answer_relevancy', 'faithfulness', 'context_recall', 'context_precision']:
+        for metric_name in ['answer_relevancy', 'faithfulness', 'answer_correctness',
+                            'context_recall', 'context_precision']:
             if metric_name in df.columns:
                 scores = df[metric_name].tolist()
                 valid_scores = [s for s in scores if not pd.isna(s)]
@@ -272,6 +311,35 @@ class TestRAGASEvaluation:
                 else:
                     print(f"{metric_name}: All evaluations failed")
 
+    def test_local_embeddings_agreement(self, sample_dataset):
+        """Compare answer similarity from local embeddings with Cohere embeddings."""
+        answers = sample_dataset["answer"]
+        # Pair each answer with every ground truth so scores cover matches and mismatches
+        references = sample_dataset["ground_truth"]
+        pairs = [(a, r) for a in answers for r in references]
+        left, right = [a for a, _ in pairs], [r for _, r in pairs]
+
+        start_time = time.time()
+        remote = batch_answer_similarity(left, right, self.ragas_embeddings)
+        remote_time = time.time() - start_time
+
+        start_time = time.time()
+        local = batch_answer_similarity(left, right, get_ragas_config(embeddings_backend="local")["embeddings"])
+        local_time = time.time() - start_time
+
+        correlation = float(np.corrcoef(remote, local)[0, 1])
+        print("\n=== Local vs Cohere Embeddings ===")
+        print(f"Cohere: {len(pairs) / remote_time:.0f} rows/s, local: {len(pairs) / local_time:.0f} rows/s")
+        print(f"Score correlation: {correlation:.3f}, "
+              f"mean absolute difference: {float(np.mean(np.abs(remote - local))):.3f}")
+
+        # Matching pairs should rank above mismatches with both backends
+        assert correlation > 0
+        for scores in (remote, local):
+            grid = scores.reshape(len(answers), len(references))
+            for i, row in enumerate(grid):
+                assert row[i] > np.delete(row, i).max()
+
     def test_small_batch_evaluation(self):
         """Test with very small batch to avoid rate limits."""
         # Create minimal dataset
@@ -293,7 +361,8 @@ class TestRAGASEvaluation:
             metrics=[answer_relevancy],
             llm=self.ragas_llm,
             embeddings=self.ragas_embeddings,
-            raise_exceptions=False
+            raise_exceptions=False,
+            run_config=self.run_config
         )
 
         df = result.to_pandas()
@@ -0,0 +1,81 @@
+"""Tests for the FAISS retrieval layer and grounded chat."""
+
+import tempfile
+import pytest
+from unittest.mock import Mock
+from config import TEST_CONTEXTS, TEST_GROUND_TRUTHS, TEST_QUESTIONS
+from local_embeddings import LocalHashingEmbeddings
+from retrieval import Retriever, build_retriever
+from assistant import Assistant
+from evaluation import build_ragas_dataset
+
+
+@pytest.fixture
+def retriever():
+    """Retriever over the test corpus with offline embeddings."""
+    return build_retriever(TEST_CONTEXTS, LocalHashingEmbeddings())
+
+
+class TestRetrieval:
+    """Test cases for Retriever and its use in Assistant.chat."""
+
+    def test_search_returns_relevant_context(self, retriever):
+        """Test the best match for each test question is its own context."""
+        for question, context in zip(TEST_QUESTIONS, TEST_CONTEXTS):
+            assert retriever.search(question, k=1) == [context]
+
+    def test_incremental_add(self, retriever):
+        """Test chunks added later are searchable."""
+        retriever.add(["Paris is the capital and largest city of France."])
+
+        assert len(retriever) == len(TEST_CONTEXTS) + 1
+        assert retriever.search("What is the capital of France?", k=1) == [
+            "Paris is the capital and largest city of France."
+        ]
+
+    def test_save_and_load_roundtrip(self, retriever):
+        """Test a saved index loads memory-mapped with identical results."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            retriever.save(tmp_dir)
+            loaded = Retriever.load(tmp_dir, retriever.embeddings)
+
+            assert loaded.chunks == retriever.chunks
+            assert loaded.search_batch(TEST_QUESTIONS) == retriever.search_batch(TEST_QUESTIONS)
+
+    def test_chat_injects_contexts(self, mock_cohere_client, retriever):
+        """Test Assistant.chat sends retrieved contexts as documents."""
+        assistant = Assistant(api_key="test-key", retriever=retriever)
+        assistant.chat("How does machine learning work?")
+
+        documents = mock_cohere_client.chat.call_args.kwargs["documents"]
+        assert documents[0] == {"text": TEST_CONTEXTS[1]}
+        assert assistant.last_contexts == [doc["text"] for doc in documents]
+
+    def test_build_ragas_dataset_records_contexts(self, mock_cohere_client, retriever):
+        """Test each row holds the answer and the contexts sent with its question."""
+        assistant = Assistant(api_key="test-key", retriever=retriever)
+
+        dataset = build_ragas_dataset(assistant, TEST_QUESTIONS, TEST_GROUND_TRUTHS)
+
+        assert dataset["question"] == TEST_QUESTIONS
+        assert dataset["ground_truth"] == TEST_GROUND_TRUTHS
+        assert dataset["answer"] == ["This is a test response from the AI assistant."] * len(TEST_QUESTIONS)
+        for call, contexts in zip(mock_cohere_client.chat.call_args_list, dataset["contexts"]):
+            assert call.kwargs["chat_history"] == []
+            assert [doc["text"] for doc in call.kwargs["documents"]] == contexts
+        assert [contexts[0] for contexts in dataset["contexts"]] == TEST_CONTEXTS
+
+    def test_build_ragas_dataset_leaves_out_failed_questions(self, mock_cohere_client, retriever):
+        """Test a failed reply is dropped with its ground truth, not scored as an answer."""
+        replies = [Mock(text="first"), ValueError("bad request"), Mock(text="third")]
+        mock_cohere_client.chat.side_effect = replies
+        assistant = Assistant(api_key="test-key", retriever=retriever)
+
+        dataset = build_ragas_dataset(assistant, TEST_QUESTIONS[:3], TEST_GROUND_TRUTHS[:3])
+
+        assert dataset["answer"] == ["first", "third"]
+        assert dataset["question"] == [TEST_QUESTIONS[0], TEST_QUESTIONS[2]]
+        assert dataset["ground_truth"] == [TEST_GROUND_TRUTHS[0], TEST_GROUND_TRUTHS[2]]
+        with pytest.raises(ValueError):
+            mock_cohere_client.chat.side_effect = ValueError("bad request")
+            build_ragas_dataset(assistant, TEST_QUESTIONS[:1], raise_exceptions=True)
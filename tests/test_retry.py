@@ -0,0 +1,130 @@
+"""Tests for the shared retry engine and circuit breaker."""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock, patch
+from retry import (CircuitBreaker, CircuitOpenError, RetryPolicy, RetryingEmbeddings, classify,
+                   cohere_retry_policy, retry_after, RATE_LIMITED, TRANSIENT, FATAL)
+
+
+class ApiError(Exception):
+    """Stand-in for a Cohere SDK error carrying an HTTP status."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status_code: {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def fast_policy(**kwargs):
+    kwargs.setdefault("base_delay", 0.001)
+    kwargs.setdefault("max_delay", 0.01)
+    return RetryPolicy(**kwargs)
+
+
+class TestRetry:
+    """Test cases for RetryPolicy and CircuitBreaker."""
+
+    def test_classify_by_status_and_type(self):
+        """Test errors are classified by status and type, not message text."""
+        assert classify(ApiError(429)) == RATE_LIMITED
+        assert classify(ApiError(503)) == TRANSIENT
+        assert classify(ApiError(400)) == FATAL
+        assert classify(TimeoutError()) == TRANSIENT
+        assert classify(Exception("429 in the message is not a status")) == FATAL
+
+    def test_retry_after_header(self):
+        """Test Retry-After seconds are parsed and honoured."""
+        assert retry_after(ApiError(429, {"retry-after": "7"})) == 7.0
+        assert retry_after(ApiError(429)) is None
+        assert fast_policy().next_delay(1.0, ApiError(429, {"Retry-After": "0.5"})) == 0.5
+
+    def test_transient_error_is_retried(self):
+        """Test a transient failure followed by success returns the result."""
+        policy = fast_policy()
+        func = Mock(side_effect=[ApiError(503), ApiError(429), "ok"])
+
+        assert policy.call(func) == "ok"
+        assert func.call_count == 3
+        assert policy.stats()["retries"] == 2
+
+    def test_fatal_error_is_not_retried(self):
+        """Test client errors are raised on the first attempt."""
+        policy = fast_policy()
+        func = Mock(side_effect=ApiError(401))
+
+        with pytest.raises(ApiError):
+            policy.call(func)
+        assert func.call_count == 1
+
+    def test_circuit_opens_and_fails_fast(self):
+        """Test repeated transient failures open the circuit until the reset timeout."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+        policy = fast_policy(max_attempts=3, breaker=breaker)
+        func = Mock(side_effect=ApiError(503))
+
+        with pytest.raises(ApiError):
+            policy.call(func)
+        with pytest.raises(CircuitOpenError):
+            policy.call(func)
+        assert func.call_count == 3
+        assert breaker.state == "open"
+
+        time.sleep(0.06)
+        func.side_effect = None
+        func.return_value = "recovered"
+        assert policy.call(func) == "recovered"
+        assert breaker.state == "closed"
+
+    def test_interrupted_trial_call_ends_the_trial(self):
+        """Test a KeyboardInterrupt during the half-open trial does not wedge the circuit."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        policy = fast_policy(max_attempts=1, breaker=breaker)
+
+        with pytest.raises(ApiError):
+            policy.call(Mock(side_effect=ApiError(503)))
+        time.sleep(0.06)
+        with pytest.raises(KeyboardInterrupt):
+            policy.call(Mock(side_effect=KeyboardInterrupt()))
+
+        assert policy.call(Mock(return_value="ok")) == "ok"
+        assert breaker.state == "closed"
+
+    def test_async_variant(self):
+        """Test acall retries coroutines the same way."""
+        policy = fast_policy()
+        attempts = []
+
+        @policy
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise ApiError(502)
+            return "ok"
+
+        assert asyncio.run(flaky()) == "ok"
+        assert len(attempts) == 2
+
+    def test_every_attempt_takes_a_rate_limiter_slot(self):
+        """Test retried embeddings calls take a limiter slot per attempt, not once."""
+        limiter = Mock()
+        upstream = Mock()
+        upstream.embed_query.side_effect = [ApiError(503), [0.1, 0.2]]
+        embeddings = RetryingEmbeddings(upstream, limiter)
+
+        with patch.object(cohere_retry_policy(), "next_delay", return_value=0.0):
+            assert embeddings.embed_query("text") == [0.1, 0.2]
+
+        assert upstream.embed_query.call_count == 2
+        assert limiter.acquire.call_count == 2
+
+    def test_assistant_chat_retries(self, ai_assistant):
+        """Test Assistant.chat retries transient errors instead of failing at once."""
+        ai_assistant.retry_policy = fast_policy()
+        ok = Mock(text="Recovered response")
+        ai_assistant.client.chat.side_effect = [ApiError(503), ok]
+
+        assert ai_assistant.chat("Hello") == "Recovered response"
+        assert ai_assistant.client.chat.call_count == 2
+        assert ai_assistant.client.chat.call_args.kwargs["request_options"] == {"max_retries": 0}
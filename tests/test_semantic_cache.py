@@ -0,0 +1,133 @@
+"""Tests for the semantic response cache."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock
+from semantic_cache import SemanticCache
+from assistant import Assistant
+import batch
+
+VECTORS = {
+    "What is AI?": [1.0, 0.0, 0.0],
+    "Explain artificial intelligence": [0.95, 0.05, 0.0],
+    "How do neural networks function?": [0.0, 1.0, 0.0],
+    "What is Python?": [0.0, 0.0, 1.0],
+}
+
+
+@pytest.fixture
+def fake_embeddings():
+    """Embeddings where paraphrases of the same question are close."""
+    embeddings = Mock()
+    embeddings.embed_query.side_effect = lambda text: VECTORS[text]
+    return embeddings
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache and its use in Assistant.chat."""
+
+    def test_paraphrase_hits(self, fake_embeddings):
+        """Test a differently worded question returns the stored answer."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9)
+        cache.store("What is AI?", "AI is intelligence shown by machines.")
+
+        assert cache.lookup("Explain artificial intelligence") == "AI is intelligence shown by machines."
+        assert cache.lookup("How do neural networks function?") is None
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_eviction_is_bounded_lru(self, fake_embeddings):
+        """Test the least recently used answer is evicted when full."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9, max_entries=2)
+        cache.store("What is AI?", "ai")
+        cache.store("How do neural networks function?", "nn")
+        cache.lookup("What is AI?")  # AI is now most recently used
+        cache.store("What is Python?", "python")
+
+        assert len(cache) == 2
+        assert cache.lookup("How do neural networks function?") is None
+        assert cache.lookup("What is AI?") == "ai"
+        assert cache.lookup("What is Python?") == "python"
+
+    def test_chat_hit_skips_generation(self, mock_cohere_client, fake_embeddings):
+        """Test a cache hit answers a first-turn question without calling Cohere."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9)
+        first = Assistant(api_key="test-key", semantic_cache=cache)
+        second = Assistant(api_key="test-key", semantic_cache=cache)
+
+        answer = first.chat("What is AI?")
+        cached = second.chat("Explain artificial intelligence")
+
+        assert cached == answer
+        assert mock_cohere_client.chat.call_count == 1
+        assert second.history[1] == {"role": "CHATBOT", "message": answer}
+
+    def test_follow_up_questions_bypass_cache(self, mock_cohere_client, fake_embeddings):
+        """Test questions asked mid-conversation are neither looked up nor stored."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9)
+        assistant = Assistant(api_key="test-key", semantic_cache=cache)
+
+        assistant.chat("What is Python?")
+        assistant.chat("What is AI?")
+
+        assert len(cache) == 1
+        assert mock_cohere_client.chat.call_count == 2
+
+    def test_cache_failure_falls_through_to_generation(self, mock_cohere_client, mock_async_cohere_client):
+        """Test a failing embed call neither fails the turn nor leaves it unanswered."""
+        embeddings = Mock()
+        embeddings.embed_query.side_effect = RuntimeError("status_code: 429")
+        assistant = Assistant(api_key="test-key", semantic_cache=SemanticCache(embeddings))
+
+        reply = assistant.chat("What is AI?")
+        assert reply == "This is a test response from the AI assistant."
+        assert assistant.history[1] == {"role": "CHATBOT", "message": reply}
+
+        assistant.clear_history()
+        reply = asyncio.run(assistant.achat("What is AI?"))
+        assert reply == "This is an async test response."
+        assert len(assistant.history) == 2
+
+    def test_batch_prompts_without_history_use_cache(self, ai_assistant, mock_async_cohere_client,
+                                                     fake_embeddings):
+        """Test acomplete answers repeated history-free prompts, as in batch mode, from the cache."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9)
+        ai_assistant.semantic_cache = cache
+
+        async def run():
+            first = await ai_assistant.acomplete("What is AI?")
+            repeat = await ai_assistant.acomplete("Explain artificial intelligence")
+            follow_up = await ai_assistant.acomplete("What is AI?", [{"role": "USER", "message": "Hi"}])
+            return first, repeat, follow_up
+
+        first, repeat, follow_up = asyncio.run(run())
+
+        assert repeat == (first[0], [])
+        assert follow_up[0] == first[0]
+        assert mock_async_cohere_client.chat.call_count == 2
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_batch_summary_reports_cache_stats(self, ai_assistant, mock_async_cohere_client,
+                                               fake_embeddings, tmp_path, capsys):
+        """Test the batch summary includes the semantic cache's hit rate."""
+        ai_assistant.semantic_cache = SemanticCache(fake_embeddings, threshold=0.9)
+        jobs = tmp_path / "jobs.jsonl"
+        jobs.write_text('{"id": 1, "prompt": "What is AI?"}\n'
+                        '{"id": 2, "prompt": "Explain artificial intelligence"}\n')
+
+        batch.main(ai_assistant, str(jobs), str(tmp_path / "out.jsonl"), concurrency=1)
+
+        summary = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+        assert summary["semantic_cache"] == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    def test_new_retriever_clears_cache(self, mock_cohere_client, fake_embeddings):
+        """Test answers grounded in the old retriever's contexts are not served after it changes."""
+        cache = SemanticCache(fake_embeddings, threshold=0.9)
+        assistant = Assistant(api_key="test-key", semantic_cache=cache)
+        assistant.chat("What is AI?")
+
+        assistant.retriever = assistant.retriever
+        assert len(cache) == 1
+
+        assistant.retriever = Mock()
+        assert len(cache) == 0
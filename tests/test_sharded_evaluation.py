@@ -0,0 +1,116 @@
+"""Tests for sharded evaluation and the shared rate limiter."""
+
+import math
+import time
+from multiprocessing import AuthenticationError
+import pandas as pd
+import pytest
+from datasets import Dataset
+from ragas.utils import safe_nanmean
+import evaluation
+from evaluation import ShardedEvaluationResult, evaluate_sharded, shard_bounds
+from rate_limiter import CoordinatedRateLimiter, RateLimiter, start_coordinator
+
+
+def fake_evaluate_shard(data, metric_names, coordinator_address, raise_exceptions):
+    """Stand-in for evaluate_shard, run in the pool's worker processes.
+
+    Takes one slot from the coordinator per row and returns columns named the
+    way ragas >= 0.2 names them; a shard holding "crash" dies instead.
+    """
+    if "crash" in data["question"]:
+        raise RuntimeError("worker died")
+    limiter = CoordinatedRateLimiter(coordinator_address)
+    for _ in data["question"]:
+        limiter.acquire()
+    return pd.DataFrame({
+        "user_input": data["question"],
+        "response": data["answer"],
+        "faithfulness": [0.5] * len(data["question"]),
+    })
+
+
+class TestShardedEvaluation:
+    """Test cases for splitting, merging and rate limiting."""
+
+    def test_shard_bounds_cover_all_rows(self):
+        """Test shards are contiguous, balanced and cover every row once."""
+        bounds = shard_bounds(10, 3)
+
+        assert bounds == [(0, 4), (4, 7), (7, 10)]
+        assert shard_bounds(2, 8) == [(0, 1), (1, 2)]
+
+    def test_merge_matches_single_process_run(self):
+        """Test merged aggregates and failure counts equal a single-frame run."""
+        single = pd.DataFrame({
+            "question": ["q1", "q2", "q3", "q4", "q5"],
+            "faithfulness": [1.0, float("nan"), 0.5, 0.0, 1.0],
+            "answer_relevancy": [0.9, 0.8, float("nan"), float("nan"), 0.7],
+        })
+        frames = [single.iloc[start:end] for start, end in shard_bounds(len(single), 2)]
+
+        merged = ShardedEvaluationResult(frames, ["faithfulness", "answer_relevancy"])
+        unsharded = ShardedEvaluationResult([single], ["faithfulness", "answer_relevancy"])
+
+        assert merged.scores == unsharded.scores
+        for column in merged.metric_columns:
+            # The aggregate ragas.evaluate reports for the same per-row scores
+            assert merged[column] == pytest.approx(safe_nanmean(single[column].tolist()))
+        assert merged["faithfulness"] == pytest.approx(single["faithfulness"].mean())
+        assert merged.failures == {"faithfulness": 1, "answer_relevancy": 2}
+        assert merged.to_pandas()["question"].tolist() == single["question"].tolist()
+
+    def test_merge_missing_metric_counts_as_failure(self):
+        """Test a metric absent from every shard is reported as all failed."""
+        frame = pd.DataFrame({"question": ["q1", "q2"]})
+
+        result = ShardedEvaluationResult([frame], ["context_recall"])
+
+        assert math.isnan(result["context_recall"])
+        assert result.failures == {"context_recall": 2}
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test the limiter never starts calls faster than its rate."""
+        limiter = RateLimiter(calls_per_minute=1200)  # one call every 50ms
+
+        start_time = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        elapsed = time.monotonic() - start_time
+
+        assert elapsed >= 3 * limiter.interval * 0.9
+        assert limiter.acquire(blocking=False) is False
+
+    def test_coordinator_needs_authkey_beyond_localhost(self):
+        """Test the coordinator refuses to listen on the network without a key."""
+        with pytest.raises(ValueError, match="RATE_LIMIT_AUTHKEY"):
+            start_coordinator(("0.0.0.0", 0), authkey=None)
+
+    def test_coordinator_uses_process_authkey_by_default(self):
+        """Test a keyless local coordinator serves clients sharing this process's key."""
+        coordinator = start_coordinator(calls_per_minute=1200, authkey=None)
+        try:
+            limiter = CoordinatedRateLimiter(coordinator.address, authkey=None)
+            assert limiter.acquire() is True
+
+            stranger = CoordinatedRateLimiter(coordinator.address, authkey=b"guessed")
+            with pytest.raises(AuthenticationError):
+                stranger.acquire()
+        finally:
+            coordinator.shutdown()
+
+    def test_failed_shard_rows_line_up_with_ragas_columns(self, monkeypatch):
+        """Test a dead worker's rows merge into the columns ragas returned for the rest."""
+        monkeypatch.setattr(evaluation, "evaluate_shard", fake_evaluate_shard)
+        questions = ["q1", "q2", "crash", "q4", "q5", "q6"]
+        dataset = Dataset.from_dict({"question": questions, "answer": [f"a-{q}" for q in questions]})
+
+        result = evaluate_sharded(dataset, ["faithfulness"], num_shards=3, calls_per_minute=6000)
+
+        frame = result.to_pandas()
+        assert list(frame.columns) == ["user_input", "response", "faithfulness"]
+        assert frame["user_input"].tolist() == questions
+        assert frame["response"].tolist() == [f"a-{q}" for q in questions]
+        assert frame["faithfulness"].isna().tolist() == [False, False, True, True, False, False]
+        assert result.failures == {"faithfulness": 2}
+        assert result["faithfulness"] == pytest.approx(0.5)
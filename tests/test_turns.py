@@ -0,0 +1,69 @@
+"""Tests for the compact conversation history store."""
+
+import json
+import pytest
+from turns import TurnStore, MIN_COMPRESS_BYTES
+
+
+def make_turns(count, length=10):
+    return [{"role": "USER" if i % 2 == 0 else "CHATBOT", "message": f"{i:0{length}d}"}
+            for i in range(count)]
+
+
+class TestTurnStore:
+    """Test cases for TurnStore."""
+
+    def test_behaves_like_list_of_dicts(self):
+        """Test indexing, slicing, iteration and equality match the old list."""
+        turns = make_turns(30)
+        store = TurnStore(turns, hot_size=4, compress_cold=False)
+
+        assert len(store) == 30
+        assert store == turns
+        assert store[0] == turns[0]
+        assert store[-1] == turns[-1]
+        assert store[5:9] == turns[5:9]
+        assert list(store) == turns
+        with pytest.raises(IndexError):
+            store[30]
+
+    def test_window_reuses_turn_dicts(self):
+        """Test the chat_history window is built without copying turns."""
+        store = TurnStore(make_turns(10), hot_size=6, compress_cold=False)
+
+        assert store.window() is store.window()
+        assert store.window(3) == make_turns(10)[-3:]
+        assert store.window(3)[0] is store.window()[3]
+        assert store.window(0) == []
+        with pytest.raises(ValueError):
+            store.window(7)
+
+    def test_roles_are_interned(self):
+        """Test turns share one role string instead of holding copies."""
+        store = TurnStore(make_turns(4), compress_cold=False)
+        role = "".join(["US", "ER"])
+
+        store.append({"role": role, "message": "hi"})
+
+        assert store[-1]["role"] is store[0]["role"]
+
+    def test_cold_turns_compress_and_round_trip(self):
+        """Test long turns outside the window are compressed and still read back."""
+        pytest.importorskip("zstandard")
+        turns = make_turns(20, length=MIN_COMPRESS_BYTES * 4)
+        store = TurnStore(turns, hot_size=4, compress_cold=True)
+
+        assert isinstance(store._bodies[0], bytes)
+        assert isinstance(store._bodies[-1], str)
+        assert store.to_list() == turns
+        assert json.loads(json.dumps(store.to_list())) == turns
+
+    def test_clear(self):
+        """Test clear empties the store and its window."""
+        store = TurnStore(make_turns(6), hot_size=4, compress_cold=False)
+
+        store.clear()
+        store.append({"role": "USER", "message": "again"})
+
+        assert store == [{"role": "USER", "message": "again"}]
+        assert store.window() == [{"role": "USER", "message": "again"}]
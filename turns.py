@@ -0,0 +1,120 @@
+"""Compact storage for conversation history.
+
+A history used to be a list of {"role": ..., "message": ...} dicts, which costs
+a dict per turn on top of the message text. `TurnStore` keeps roles in a byte
+array and message bodies in a plain list, and only the most recent turns - the
+window sent to Cohere as chat_history - exist as dicts. Those dicts are kept
+and reused, so building a request copies nothing. Bodies that leave the window
+can be zstd-compressed, since they are only read again to save the chat.
+"""
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from config import COMPRESS_COLD_TURNS, MAX_HISTORY
+
+USER = sys.intern("USER")
+CHATBOT = sys.intern("CHATBOT")
+ROLES = (USER, CHATBOT)
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Shorter bodies do not shrink enough to pay for the zstd frame
+MIN_COMPRESS_BYTES = 256
+
+
+class TurnStore:
+    """List-like history of turns that serializes to Cohere's chat_history shape.
+
+    Supports len(), indexing and slicing (turns come back as dicts), iteration,
+    append and clear, and compares equal to the equivalent list of dicts.
+    """
+
+    __slots__ = ("hot_size", "compress_cold", "_roles", "_bodies", "_hot")
+
+    def __init__(self, turns: Iterable[Dict[str, str]] = (), hot_size: int = MAX_HISTORY,
+                 compress_cold: bool = COMPRESS_COLD_TURNS):
+        self.hot_size = hot_size
+        self.compress_cold = compress_cold
+        self._roles = array("B")
+        self._bodies: List[object] = []  # str, or zstd-compressed bytes for cold turns
+        self._hot: List[Dict[str, str]] = []
+        for turn in turns:
+            self.append(turn)
+
+    def append(self, turn: Dict[str, str]):
+        code = ROLE_CODES[turn["role"]]
+        message = turn["message"]
+        self._roles.append(code)
+        self._bodies.append(message)
+        self._hot.append({"role": ROLES[code], "message": message})
+        if len(self._hot) > self.hot_size:
+            del self._hot[0]
+            self._freeze(len(self._bodies) - self.hot_size - 1)
+
+    def _freeze(self, index: int):
+        body = self._bodies[index]
+        if self.compress_cold and len(body) >= MIN_COMPRESS_BYTES:
+            import zstandard
+            self._bodies[index] = zstandard.compress(body.encode("utf-8"))
+
+    def _body(self, index: int) -> str:
+        body = self._bodies[index]
+        if isinstance(body, bytes):
+            import zstandard
+            return zstandard.decompress(body).decode("utf-8")
+        return body
+
+    def window(self, size: Optional[int] = None) -> List[Dict[str, str]]:
+        """The last `size` turns (at most hot_size) as Cohere chat_history dicts.
+
+        Without `size` the internal window list itself is returned; do not
+        modify it.
+        """
+        if size is None:
+            return self._hot
+        if size > self.hot_size:
+            raise ValueError(f"Only the last {self.hot_size} turns are kept as a window")
+        return self._hot[len(self._hot) - size:] if size > 0 else []
+
+    def clear(self):
+        self._roles = array("B")
+        self._bodies = []
+        self._hot = []
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """Every turn as a dict, e.g. for json.dump."""
+        return list(self)
+
+    def __len__(self):
+        return len(self._roles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("turn index out of range")
+        hot_start = len(self) - len(self._hot)
+        if index >= hot_start:
+            return self._hot[index - hot_start]
+        return {"role": ROLES[self._roles[index]], "message": self._body(index)}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (TurnStore, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"TurnStore({self.to_list()!r})"
+
+    def nbytes(self) -> int:
+        """Approximate memory held by this store, including message bodies."""
+        size = sys.getsizeof(self) + sys.getsizeof(self._roles) + sys.getsizeof(self._bodies)
+        size += sum(sys.getsizeof(body) for body in self._bodies)
+        size += sys.getsizeof(self._hot) + sum(sys.getsizeof(turn) for turn in self._hot)
+        return size